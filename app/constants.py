@@ -6,3 +6,8 @@ TIME_FMT = "%H:%M"
 
 MAX_DAYS_AHEAD = 31  # расписание на 1 месяц вперед
 
+# Рабочая сетка слотов: каждые 30 минут, 09:00 - 20:00
+WORK_TIMES: tuple[str, ...] = tuple(
+    f"{h:02d}:{m:02d}" for h in range(9, 21) for m in (0, 30) if not (h == 20 and m == 30)
+)
+
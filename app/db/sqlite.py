@@ -1,12 +1,83 @@
 from __future__ import annotations
 
+import asyncio
+import json
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Optional
+from time import monotonic
+from typing import Any, AsyncIterator, Optional, Sequence
 
 import aiosqlite
 
-from app.constants import DATETIME_FMT, DATE_FMT, TIME_FMT
+from app.constants import WORK_TIMES
+
+# Сколько строк вставлять одним INSERT (2 параметра на строку, лимит SQLite — 999)
+SLOTS_CHUNK = 300
+
+# Колонки bookings (+ имя услуги и напоминание) в порядке полей Booking — для _row_to_booking
+BOOKING_COLS = (
+    "b.id, b.user_id, b.date, b.time, b.service_id, s.name AS service_name, "
+    "b.name, b.phone, b.status, b.created_at, "
+    "r.job_id AS reminder_job_id, r.remind_at, COALESCE(r.remind_sent, 0) AS remind_sent"
+)
+# FROM для BOOKING_COLS
+BOOKING_FROM = (
+    "bookings b "
+    "LEFT JOIN services s ON b.service_id = s.id "
+    "LEFT JOIN reminders r ON r.booking_id = b.id"
+)
+
+# Размер кэша подготовленных выражений sqlite3 на соединение (по умолчанию 128):
+# с запасом на все запросы модуля и варианты IN (...) разной длины
+STATEMENT_CACHE = 256
+
+# Сколько секунд живут закэшированные ответы календаря (is_day_closed, множества дат)
+CACHE_TTL = 2.0
+
+# PRAGMA соединения по умолчанию (переопределяются через Database(pragmas=...))
+DEFAULT_PRAGMAS: dict[str, Any] = {
+    "foreign_keys": "ON",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,  # ~20 МБ кэша страниц
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,  # 256 МБ
+    "wal_autocheckpoint": 1000,
+    "busy_timeout": 5000,  # мс
+}
+
+
+
+def _compute_required_slots(start_time: str, duration_minutes: int) -> tuple[str, ...]:
+    """
+    Рассчитать какие слоты нужны для услуги.
+    Слоты каждые 30 минут.
+    """
+    h, m = map(int, start_time.split(":"))
+    start_minutes = h * 60 + m
+    end_minutes = start_minutes + duration_minutes
+
+    slots = []
+    current = start_minutes
+    while current < end_minutes:
+        h = current // 60
+        m = current % 60
+        if h > 23:
+            break
+        slots.append(f"{h:02d}:{m:02d}")
+        current += 30
+
+    return tuple(slots)
+
+
+# Все старты сетки (каждые 30 минут) × типовые длительности услуг — считаем один раз
+_REQUIRED_SLOTS: dict[tuple[str, int], tuple[str, ...]] = {
+    (f"{h:02d}:{m:02d}", duration): _compute_required_slots(f"{h:02d}:{m:02d}", duration)
+    for h in range(24)
+    for m in (0, 30)
+    for duration in range(30, 181, 30)
+}
 
 
 @dataclass(slots=True)
@@ -26,19 +97,65 @@ class Booking:
     remind_sent: int
 
 
+@dataclass(slots=True)
+class Slot:
+    date: str
+    time: str
+    is_booked: int
+    booking_id: Optional[int]
+
+
+@dataclass(slots=True)
+class Service:
+    id: int
+    name: str
+    price: int
+    duration: int
+    is_active: int
+
+
 class Database:
     """Простой слой доступа к SQLite (aiosqlite)."""
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, pragmas: dict[str, Any] | None = None, readers: int = 4) -> None:
         self.path = path
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.readers = readers
         self._conn: aiosqlite.Connection | None = None
+        self._readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._tx_lock = asyncio.Lock()
+        self._tx_owner: asyncio.Task | None = None
+        # Кэш горячих чтений календаря; сбрасывается после каждого COMMIT
+        self._cache_gen = 0
+        self._day_cache: dict[str, tuple[float, bool]] = {}
+        self._dates_cache: dict[tuple[str, str, str], tuple[float, frozenset[str]]] = {}
+        # Кэш таблицы services (маленькая, меняется редко); сбрасывается после
+        # COMMIT, в котором менялись услуги
+        self._services: dict[int, Service] | None = None
+        self._services_gen = 0
+        self._services_changed = False
 
     async def connect(self) -> None:
-        self._conn = await aiosqlite.connect(self.path)
-        self._conn.row_factory = aiosqlite.Row
-        await self._conn.execute("PRAGMA foreign_keys = ON;")
-        await self._conn.execute("PRAGMA journal_mode = WAL;")
-        await self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn = await self._open()
+        if self.readers <= 0:
+            return
+        # WAL позволяет читать параллельно с записью — держим пул читающих соединений
+        self._readers = asyncio.Queue()
+        for _ in range(self.readers):
+            reader = await self._open()
+            await reader.execute("PRAGMA query_only = 1;")
+            self._readers.put_nowait(reader)
+
+    async def _open(self) -> aiosqlite.Connection:
+        # isolation_level=None — без неявных BEGIN от модуля sqlite3:
+        # границы транзакций задаёт только transaction()
+        conn = await aiosqlite.connect(
+            self.path, isolation_level=None, cached_statements=STATEMENT_CACHE
+        )
+        conn.row_factory = aiosqlite.Row
+        for name, value in self.pragmas.items():
+            await conn.execute(f"PRAGMA {name} = {value};")
+        return conn
 
     @property
     def conn(self) -> aiosqlite.Connection:
@@ -47,10 +164,70 @@ class Database:
         return self._conn
 
     async def close(self) -> None:
+        if self._readers is not None:
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
         if self._conn is not None:
             await self._conn.close()
             self._conn = None
 
+    @asynccontextmanager
+    async def _read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Соединение для чтения из пула.
+        Внутри своей транзакции читаем через пишущее соединение — иначе не видно
+        ещё не закоммиченных изменений.
+        """
+        if self._readers is None or self._tx_owner is asyncio.current_task():
+            yield self.conn
+            return
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """
+        Транзакция на запись: BEGIN IMMEDIATE ... COMMIT (ROLLBACK при ошибке).
+        Вложенные вызовы из той же задачи присоединяются к внешней транзакции,
+        поэтому несколько изменений укладываются в один commit.
+        """
+        task = asyncio.current_task()
+        if self._tx_owner is task:
+            yield
+            return
+        async with self._tx_lock:
+            await self.conn.execute("BEGIN IMMEDIATE;")
+            self._tx_owner = task
+            try:
+                yield
+            except BaseException:
+                await self.conn.execute("ROLLBACK;")
+                self._services_changed = False
+                raise
+            else:
+                await self.conn.execute("COMMIT;")
+                self._invalidate_cache()
+            finally:
+                self._tx_owner = None
+
+    def _invalidate_cache(self) -> None:
+        # Поколение защищает от записи в кэш результата, прочитанного до COMMIT
+        self._cache_gen += 1
+        self._day_cache.clear()
+        self._dates_cache.clear()
+        if self._services_changed:
+            self._services_changed = False
+            self._services_gen += 1
+            self._services = None
+
+    def _cache_usable(self) -> bool:
+        # Внутри своей транзакции кэш не используем — нужны незакоммиченные данные
+        return self._tx_owner is not asyncio.current_task()
+
     async def init(self) -> None:
         """Создание таблиц (если их нет)."""
         await self.conn.executescript(
@@ -78,12 +255,18 @@ class Database:
               phone TEXT NOT NULL,
               status TEXT NOT NULL DEFAULT 'active',  -- active/cancelled
               created_at TEXT NOT NULL,        -- YYYY-MM-DD HH:MM:SS
-              reminder_job_id TEXT,
-              remind_at TEXT,
-              remind_sent INTEGER NOT NULL DEFAULT 0,
               FOREIGN KEY(service_id) REFERENCES services(id)
             );
 
+            -- напоминания отдельно: их частые обновления не переписывают строки bookings
+            CREATE TABLE IF NOT EXISTS reminders (
+              booking_id INTEGER PRIMARY KEY,
+              job_id TEXT NOT NULL,
+              remind_at TEXT NOT NULL,         -- YYYY-MM-DD HH:MM:SS
+              remind_sent INTEGER NOT NULL DEFAULT 0,
+              FOREIGN KEY(booking_id) REFERENCES bookings(id) ON DELETE CASCADE
+            );
+
             CREATE TABLE IF NOT EXISTS slots (
               id INTEGER PRIMARY KEY AUTOINCREMENT,
               date TEXT NOT NULL,              -- YYYY-MM-DD
@@ -95,110 +278,218 @@ class Database:
               FOREIGN KEY(booking_id) REFERENCES bookings(id) ON DELETE SET NULL
             );
 
-            CREATE INDEX IF NOT EXISTS idx_slots_date ON slots(date);
-            CREATE INDEX IF NOT EXISTS idx_bookings_user ON bookings(user_id);
-            CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings(date);
+            -- (date, is_booked, time) покрывает поиск по date, проверку свободных слотов
+            -- и отдаёт свободные времена уже отсортированными — без чтения таблицы
+            DROP INDEX IF EXISTS idx_slots_date;
+            DROP INDEX IF EXISTS idx_slots_date_booked;
+            CREATE INDEX IF NOT EXISTS idx_slots_date_free ON slots(date, is_booked, time);
+            -- частичные индексы только по активным записям (отменённые в них не попадают)
+            DROP INDEX IF EXISTS idx_bookings_user;
+            DROP INDEX IF EXISTS idx_bookings_date;
+            CREATE UNIQUE INDEX IF NOT EXISTS uniq_active_user ON bookings(user_id) WHERE status='active';
+            CREATE INDEX IF NOT EXISTS idx_bookings_date_active ON bookings(date, time) WHERE status='active';
+            CREATE UNIQUE INDEX IF NOT EXISTS uniq_active_slot ON bookings(date, time) WHERE status='active';
+            DROP INDEX IF EXISTS idx_bookings_remind;
+            -- отправленные напоминания в индекс не попадают
+            DROP INDEX IF EXISTS idx_reminders_pending;
+            CREATE INDEX IF NOT EXISTS idx_reminders_unsent ON reminders(remind_at) WHERE remind_sent=0;
+
+            -- отмена записи освобождает её слоты в том же выражении
+            -- (date в условии — чтобы искать по индексу, а не сканировать slots)
+            CREATE TRIGGER IF NOT EXISTS trg_bookings_release_slots
+            AFTER UPDATE OF status ON bookings
+            WHEN OLD.status = 'active' AND NEW.status <> 'active'
+            BEGIN
+              UPDATE slots SET is_booked=0, booking_id=NULL
+              WHERE date = NEW.date AND booking_id = NEW.id;
+            END;
             """
         )
-        await self.conn.commit()
+        await self._migrate_reminders()
 
+        async with self.transaction():
+            cur = await self.conn.execute("SELECT COUNT(*) as cnt FROM services;")
+            row = await cur.fetchone()
+            if row["cnt"] == 0:
+                await self.conn.executemany(
+                    "INSERT INTO services(name, price, duration, is_active) VALUES (?, ?, ?, 1);",
+                    [("Френч", 1000, 90), ("Квадрат", 500, 60)],
+                )
+                self._services_changed = True
 
-        cur = await self.conn.execute("SELECT COUNT(*) as cnt FROM services;")
-        row = await cur.fetchone()
-        if row["cnt"] == 0:
+   
+
+    async def _migrate_reminders(self) -> None:
+        """Перенос напоминаний из старых колонок bookings в таблицу reminders."""
+        cur = await self.conn.execute("PRAGMA table_info(bookings);")
+        columns = {r["name"] for r in await cur.fetchall()}
+        if "reminder_job_id" not in columns:
+            return
+        async with self.transaction():
             await self.conn.execute(
-                "INSERT INTO services(name, price, duration, is_active) VALUES (?, ?, ?, ?);",
-                ("Френч", 1000, 90, 1),
+                """
+                INSERT OR IGNORE INTO reminders(booking_id, job_id, remind_at, remind_sent)
+                SELECT id, reminder_job_id, remind_at, remind_sent FROM bookings
+                WHERE reminder_job_id IS NOT NULL AND remind_at IS NOT NULL;
+                """
             )
+            for column in ("reminder_job_id", "remind_at", "remind_sent"):
+                await self.conn.execute(f"ALTER TABLE bookings DROP COLUMN {column};")
+
+    async def add_working_day(self, date: str, auto_add_slots: bool = True) -> None:
+        async with self.transaction():
             await self.conn.execute(
-                "INSERT INTO services(name, price, duration, is_active) VALUES (?, ?, ?, ?);",
-                ("Квадрат", 500, 60, 1),
+                "INSERT OR IGNORE INTO working_days(date, is_closed) VALUES (?, 0);",
+                (date,),
             )
-            await self.conn.commit()
 
-   
-
-    async def add_working_day(self, date: str, auto_add_slots: bool = True) -> None:
-        await self.conn.execute(
-            "INSERT OR IGNORE INTO working_days(date, is_closed) VALUES (?, 0);",
-            (date,),
-        )
-        await self.conn.commit()
-        
-        
-        if auto_add_slots:
-            hours = list(range(9, 21))
-            for h in hours:
-                for m in (0, 30):
-                    if h == 20 and m == 30:
-                        continue
-                    time_s = f"{h:02d}:{m:02d}"
-                    await self.conn.execute(
-                        "INSERT OR IGNORE INTO slots(date, time, is_booked) VALUES (?, ?, 0);",
-                        (date, time_s),
-                    )
-            await self.conn.commit()
+            if auto_add_slots:
+                await self._insert_slots(date, WORK_TIMES)
 
     async def set_day_closed(self, date: str, closed: bool) -> None:
-        await self.add_working_day(date)
-        await self.conn.execute(
-            "UPDATE working_days SET is_closed=? WHERE date=?;",
-            (1 if closed else 0, date),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            await self.add_working_day(date)
+            await self.conn.execute(
+                "UPDATE working_days SET is_closed=? WHERE date=?;",
+                (1 if closed else 0, date),
+            )
 
     async def is_day_closed(self, date: str) -> bool:
-        cur = await self.conn.execute(
-            "SELECT is_closed FROM working_days WHERE date=?;",
-            (date,),
-        )
-        row = await cur.fetchone()
-        return bool(row["is_closed"]) if row else False
+        use_cache = self._cache_usable()
+        if use_cache:
+            hit = self._day_cache.get(date)
+            if hit and monotonic() - hit[0] < CACHE_TTL:
+                return hit[1]
+        gen = self._cache_gen
+
+        async with self._read() as conn:
+            cur = await conn.execute(
+                "SELECT is_closed FROM working_days WHERE date=?;",
+                (date,),
+            )
+            row = await cur.fetchone()
+        closed = bool(row["is_closed"]) if row else False
+
+        if use_cache and gen == self._cache_gen:
+            self._day_cache[date] = (monotonic(), closed)
+        return closed
+
+    async def _date_set(self, kind: str, sql: str, start_date: str, end_date: str) -> frozenset[str]:
+        """
+        Множество дат из запроса по диапазону (два параметра: start, end).
+        Кэшируется на CACHE_TTL и сбрасывается после каждого COMMIT.
+        """
+        key = (kind, start_date, end_date)
+        use_cache = self._cache_usable()
+        if use_cache:
+            hit = self._dates_cache.get(key)
+            if hit and monotonic() - hit[0] < CACHE_TTL:
+                return hit[1]
+        gen = self._cache_gen
+
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(sql, (start_date, end_date))
+        result = frozenset(r[0] for r in rows)
+
+        if use_cache and gen == self._cache_gen:
+            self._dates_cache[key] = (monotonic(), result)
+        return result
 
-    async def list_open_dates(self, start_date: str, end_date: str) -> list[str]:
+    async def list_open_dates(self, start_date: str, end_date: str) -> frozenset[str]:
         """
         Даты, которые открыты (is_closed = 0).
         start_date/end_date: YYYY-MM-DD (inclusive).
         """
-        cur = await self.conn.execute(
-            """
-            SELECT date FROM working_days
-            WHERE date BETWEEN ? AND ? AND is_closed = 0
-            ORDER BY date ASC;
-            """,
-            (start_date, end_date),
+        return await self._date_set(
+            "open",
+            "SELECT date FROM working_days WHERE date BETWEEN ? AND ? AND is_closed = 0;",
+            start_date,
+            end_date,
         )
-        rows = await cur.fetchall()
-        return [r["date"] for r in rows]
 
     async def add_slot(self, date: str, time: str) -> bool:
         """Добавить слот. True если добавлен, False если уже был."""
-        await self.add_working_day(date)
-        if await self.is_day_closed(date):
-            return False
-        cur = await self.conn.execute(
-            "INSERT OR IGNORE INTO slots(date, time, is_booked) VALUES (?, ?, 0);",
-            (date, time),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            await self.add_working_day(date)
+            # в закрытый день слот не добавляем — проверка прямо в INSERT
+            cur = await self.conn.execute(
+                """
+                INSERT OR IGNORE INTO slots(date, time, is_booked)
+                SELECT ?, ?, 0
+                WHERE EXISTS (SELECT 1 FROM working_days WHERE date=? AND is_closed=0);
+                """,
+                (date, time, date),
+            )
         return cur.rowcount > 0
 
+    async def add_slots(self, date: str, times: list[str]) -> int:
+        """Добавить несколько слотов за одну транзакцию. Возвращает число добавленных."""
+        async with self.transaction():
+            await self.add_working_day(date, auto_add_slots=False)
+            if await self.is_day_closed(date):
+                return 0
+            return await self._insert_slots(date, times)
+
+    async def bulk_add_slots(self, entries: list[tuple[str, str]]) -> int:
+        """
+        Импорт слотов на несколько дат: entries = [(YYYY-MM-DD, HH:MM), ...].
+        Данные уходят одним JSON-параметром в json_each — по одному запросу
+        на рабочие дни и на слоты. Закрытые дни пропускаются.
+        Возвращает число добавленных слотов.
+        """
+        payload = json.dumps([{"d": d, "t": t} for d, t in entries])
+        async with self.transaction():
+            await self.conn.execute(
+                """
+                INSERT OR IGNORE INTO working_days(date, is_closed)
+                SELECT DISTINCT json_extract(value, '$.d'), 0 FROM json_each(?);
+                """,
+                (payload,),
+            )
+            cur = await self.conn.execute(
+                """
+                INSERT OR IGNORE INTO slots(date, time, is_booked)
+                SELECT json_extract(j.value, '$.d'), json_extract(j.value, '$.t'), 0
+                FROM json_each(?) j
+                JOIN working_days d ON d.date = json_extract(j.value, '$.d')
+                WHERE d.is_closed = 0;
+                """,
+                (payload,),
+            )
+        return cur.rowcount
+
+    async def _insert_slots(self, date: str, times: Sequence[str]) -> int:
+        """Многострочный INSERT OR IGNORE пачками по SLOTS_CHUNK (без commit)."""
+        added = 0
+        for i in range(0, len(times), SLOTS_CHUNK):
+            chunk = times[i : i + SLOTS_CHUNK]
+            values = ",".join(["(?, ?, 0)"] * len(chunk))
+            params = [p for t in chunk for p in (date, t)]
+            cur = await self.conn.execute(
+                f"INSERT OR IGNORE INTO slots(date, time, is_booked) VALUES {values};",
+                params,
+            )
+            added += cur.rowcount
+        return added
+
     async def delete_slot(self, date: str, time: str) -> bool:
         """Удалить слот (только если не забронирован)."""
-        cur = await self.conn.execute(
-            "DELETE FROM slots WHERE date=? AND time=? AND is_booked=0;",
-            (date, time),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            cur = await self.conn.execute(
+                "DELETE FROM slots WHERE date=? AND time=? AND is_booked=0;",
+                (date, time),
+            )
         return cur.rowcount > 0
 
-    async def list_slots(self, date: str) -> list[dict[str, Any]]:
-        cur = await self.conn.execute(
-            "SELECT date, time, is_booked, booking_id FROM slots WHERE date=? ORDER BY time ASC;",
-            (date,),
-        )
-        rows = await cur.fetchall()
-        return [dict(r) for r in rows]
+    async def list_slots(self, date: str) -> list[Slot]:
+        async with self._read() as conn:
+            cur = await conn.execute(
+                "SELECT time, is_booked, booking_id FROM slots WHERE date=? ORDER BY time ASC;",
+                (date,),
+            )
+            rows = await cur.fetchall()
+        # позиционный доступ вместо dict(Row): без обхода keys() на каждую строку
+        return [Slot(date, r[0], r[1], r[2]) for r in rows]
 
     async def list_free_slots(self, date: str, service_id: Optional[int] = None) -> list[str]:
         """
@@ -206,111 +497,175 @@ class Database:
         Если указан service_id — показываем только слоты, где хватает времени.
         """
       
-        cur = await self.conn.execute(
-            """
-            SELECT time FROM slots
-            WHERE date=? AND is_booked=0
-            ORDER BY time ASC;
-            """,
-            (date,),
-        )
-        rows = await cur.fetchall()
-        all_free = [r["time"] for r in rows]
+        async with self._read() as conn:
+            cur = await conn.execute(
+                """
+                SELECT time FROM slots
+                WHERE date=? AND is_booked=0
+                ORDER BY time ASC;
+                """,
+                (date,),
+            )
+            rows = await cur.fetchall()
+        all_free = [r[0] for r in rows]
         
         if not service_id:
             return all_free
         
        
         duration = await self.get_service_duration(service_id)
+        free_set = set(all_free)  # all_free — для порядка, set — для проверки
         available = []
         
         for start_time in all_free:
             required = self._get_required_slots(start_time, duration)
             
-            if all(t in all_free for t in required):
+            if all(t in free_set for t in required):
                 available.append(start_time)
         
         return available
 
-    async def list_available_dates(self, start_date: str, end_date: str) -> list[str]:
+    async def list_closed_dates(self, start_date: str, end_date: str) -> frozenset[str]:
+        """
+        Даты, которые закрыты (is_closed = 1).
+        start_date/end_date: YYYY-MM-DD (inclusive).
+        """
+        return await self._date_set(
+            "closed",
+            "SELECT date FROM working_days WHERE date BETWEEN ? AND ? AND is_closed = 1;",
+            start_date,
+            end_date,
+        )
+
+    async def list_available_dates(self, start_date: str, end_date: str) -> frozenset[str]:
         """
-        Даты, где есть свободные слоты (независимо от working_days).
+        Открытые даты, где есть свободные слоты.
         start_date/end_date: YYYY-MM-DD (inclusive).
         """
-        cur = await self.conn.execute(
+        result = await self._date_set(
+            "available",
             """
-            SELECT s.date
-            FROM slots s
-            LEFT JOIN working_days d ON s.date = d.date
-            WHERE s.date BETWEEN ? AND ?
-              AND (d.is_closed IS NULL OR d.is_closed = 0)
-              AND s.is_booked = 0
-            GROUP BY s.date
-            ORDER BY s.date ASC;
+            SELECT d.date
+            FROM working_days d
+            JOIN slots s ON s.date = d.date AND s.is_booked = 0
+            WHERE d.date BETWEEN ? AND ?
+              AND d.is_closed = 0
+            GROUP BY d.date;
             """,
-            (start_date, end_date),
+            start_date,
+            end_date,
         )
-        rows = await cur.fetchall()
-        result = [r["date"] for r in rows]
-        print(f"[DEBUG] list_available_dates({start_date}, {end_date}) = {result}")
+        print(f"[DEBUG] list_available_dates({start_date}, {end_date}) = {sorted(result)}")
         return result
 
-    async def list_dates_with_slots(self, start_date: str, end_date: str) -> list[str]:
+    async def list_calendar_dates(self, start_date: str, end_date: str) -> tuple[frozenset[str], frozenset[str]]:
+        """
+        (открытые даты со свободными слотами, все открытые даты) одним запросом.
+        Результат кладётся в те же записи кэша, что и у list_available_dates/list_open_dates.
+        """
+        avail_key = ("available", start_date, end_date)
+        open_key = ("open", start_date, end_date)
+        use_cache = self._cache_usable()
+        if use_cache:
+            now = monotonic()
+            avail_hit = self._dates_cache.get(avail_key)
+            open_hit = self._dates_cache.get(open_key)
+            if avail_hit and open_hit and now - avail_hit[0] < CACHE_TTL and now - open_hit[0] < CACHE_TTL:
+                return avail_hit[1], open_hit[1]
+        gen = self._cache_gen
+
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(
+                """
+                SELECT d.date,
+                       EXISTS (SELECT 1 FROM slots s WHERE s.date = d.date AND s.is_booked = 0)
+                FROM working_days d
+                WHERE d.date BETWEEN ? AND ? AND d.is_closed = 0;
+                """,
+                (start_date, end_date),
+            )
+        available = frozenset(r[0] for r in rows if r[1])
+        open_dates = frozenset(r[0] for r in rows)
+
+        if use_cache and gen == self._cache_gen:
+            now = monotonic()
+            self._dates_cache[avail_key] = (now, available)
+            self._dates_cache[open_key] = (now, open_dates)
+        return available, open_dates
+
+    async def list_dates_with_slots(self, start_date: str, end_date: str) -> frozenset[str]:
         """
         Даты, где есть слоты (независимо от статуса).
         start_date/end_date: YYYY-MM-DD (inclusive).
         """
-        cur = await self.conn.execute(
+        return await self._date_set(
+            "with_slots",
             """
-            SELECT DISTINCT s.date
-            FROM slots s
-            WHERE s.date BETWEEN ? AND ?
-            ORDER BY s.date ASC;
+            SELECT d.date
+            FROM working_days d
+            WHERE d.date BETWEEN ? AND ?
+              AND EXISTS (SELECT 1 FROM slots s WHERE s.date = d.date);
             """,
-            (start_date, end_date),
+            start_date,
+            end_date,
         )
-        rows = await cur.fetchall()
-        return [r["date"] for r in rows]
 
     
 
     async def get_user_active_booking(self, user_id: int) -> Optional[Booking]:
-        cur = await self.conn.execute(
-            """
-            SELECT b.*, s.name as service_name FROM bookings b
-            LEFT JOIN services s ON b.service_id = s.id
-            WHERE user_id=? AND status='active'
-            ORDER BY id DESC LIMIT 1;
-            """,
-            (user_id,),
-        )
-        row = await cur.fetchone()
+        async with self._read() as conn:
+            cur = await conn.execute(
+                f"""
+                SELECT {BOOKING_COLS} FROM {BOOKING_FROM}
+                WHERE b.user_id=? AND b.status='active'
+                LIMIT 1;
+                """,
+                (user_id,),
+            )
+            row = await cur.fetchone()
         return self._row_to_booking(row) if row else None
 
+    async def has_active_booking(self, user_id: int) -> bool:
+        """Есть ли у пользователя активная запись (без JOIN и сборки Booking)."""
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(
+                "SELECT EXISTS(SELECT 1 FROM bookings WHERE user_id=? AND status='active');",
+                (user_id,),
+            )
+        return bool(rows[0][0])
+
+    async def _get_user_active_booking_id(self, user_id: int) -> Optional[int]:
+        """Только id активной записи — без JOIN и сборки Booking."""
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(
+                "SELECT id FROM bookings WHERE user_id=? AND status='active' LIMIT 1;",
+                (user_id,),
+            )
+        return int(rows[0]["id"]) if rows else None
+
     async def get_booking_by_slot(self, date: str, time: str) -> Optional[Booking]:
-        cur = await self.conn.execute(
-            """
-            SELECT b.*, s.name as service_name FROM bookings b
-            LEFT JOIN services s ON b.service_id = s.id
-            WHERE b.date=? AND b.time=? AND b.status='active'
-            ORDER BY b.id DESC LIMIT 1;
-            """,
-            (date, time),
-        )
-        row = await cur.fetchone()
+        async with self._read() as conn:
+            cur = await conn.execute(
+                f"""
+                SELECT {BOOKING_COLS} FROM {BOOKING_FROM}
+                WHERE b.date=? AND b.time=? AND b.status='active'
+                ORDER BY b.id DESC LIMIT 1;
+                """,
+                (date, time),
+            )
+            row = await cur.fetchone()
         return self._row_to_booking(row) if row else None
 
     async def get_booking(self, booking_id: int) -> Optional[Booking]:
-        cur = await self.conn.execute(
-            """
-            SELECT b.*, s.name as service_name FROM bookings b
-            LEFT JOIN services s ON b.service_id = s.id
-            WHERE b.id=?;
-            """,
-            (booking_id,),
-        )
-        row = await cur.fetchone()
-        return self._row_to_booking(row) if row else None
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(
+                f"""
+                SELECT {BOOKING_COLS} FROM {BOOKING_FROM}
+                WHERE b.id=?;
+                """,
+                (booking_id,),
+            )
+        return self._row_to_booking(rows[0]) if rows else None
 
     async def create_booking(
         self,
@@ -326,274 +681,310 @@ class Database:
         Создать запись на слот (атомарно).
         Возвращает: (ok, booking | error_message)
         """
-        
-        await self.conn.execute("BEGIN IMMEDIATE;")
-        try:
-            # 1) Проверка: пользователь уже имеет активную запись
-            cur = await self.conn.execute(
-                "SELECT id FROM bookings WHERE user_id=? AND status='active' LIMIT 1;",
-                (user_id,),
-            )
-            if await cur.fetchone():
-                await self.conn.execute("ROLLBACK;")
-                return False, "У вас уже есть активная запись. Сначала отмените её."
-
-            # 2) Проверка: день не закрыт
-            cur = await self.conn.execute(
-                "SELECT is_closed FROM working_days WHERE date=?;",
-                (date,),
-            )
-            row = await cur.fetchone()
-            if not row or int(row["is_closed"]) == 1:
-                await self.conn.execute("ROLLBACK;")
-                return False, "Этот день недоступен для записи."
-
-            # 3) Проверка: слот существует и свободен
-            cur = await self.conn.execute(
-                "SELECT id, is_booked FROM slots WHERE date=? AND time=?;",
-                (date, time),
-            )
-            slot = await cur.fetchone()
-            if not slot:
-                await self.conn.execute("ROLLBACK;")
-                return False, "Слот не найден."
-            if int(slot["is_booked"]) == 1:
-                await self.conn.execute("ROLLBACK;")
-                return False, "Этот слот уже занят."
-
-            # 3b) Если есть услуга — проверяем все слоты на длительность
-            required_slots = [time]
+        async with self.transaction():
+            # Все слоты, которые займёт услуга
+            required_slots: tuple[str, ...] = (time,)
             if service_id:
                 duration = await self.get_service_duration(service_id)
-                required_slots = self._get_required_slots(time, duration)
-                
-                # Проверяем что все слоты свободны
-                for slot_time in required_slots:
-                    cur = await self.conn.execute(
-                        "SELECT id, is_booked FROM slots WHERE date=? AND time=?;",
-                        (date, slot_time),
-                    )
-                    s = await cur.fetchone()
-                    if not s:
-                        await self.conn.execute("ROLLBACK;")
-                        return False, f"Слот {slot_time} недоступен."
-                    if int(s["is_booked"]) == 1:
-                        await self.conn.execute("ROLLBACK;")
-                        return False, f"Слот {slot_time} уже занят."
-
-            # 4) Создаём запись
-            created_at_s = created_at.strftime(DATETIME_FMT)
-            cur = await self.conn.execute(
-                """
-                INSERT INTO bookings(user_id, date, time, service_id, name, phone, status, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, 'active', ?);
-                """,
-                (user_id, date, time, service_id, name, phone, created_at_s),
-            )
-            booking_id = int(cur.lastrowid)
-
-            # 5) Бронируем все слоты
-            for slot_time in required_slots:
-                cur = await self.conn.execute(
-                    "SELECT id FROM slots WHERE date=? AND time=?;",
-                    (date, slot_time),
+                required_slots = self._get_required_slots(time, duration) or (time,)
+            marks = ",".join("?" * len(required_slots))
+
+            # 1) Создаём запись, только если все условия выполнены (один запрос).
+            # Одна активная запись на пользователя и на слот — уникальные индексы
+            # uniq_active_user / uniq_active_slot, их нарушение = IntegrityError.
+            # RETURNING отдаёт готовую строку Booking (напоминания у новой записи ещё нет)
+            created_at_s = self._fmt_dt(created_at)
+            try:
+                rows = await self.conn.execute_fetchall(
+                    f"""
+                    INSERT INTO bookings(user_id, date, time, service_id, name, phone, status, created_at)
+                    SELECT ?, ?, ?, ?, ?, ?, 'active', ?
+                    WHERE EXISTS (SELECT 1 FROM working_days WHERE date=? AND is_closed=0)
+                      AND (SELECT COUNT(*) FROM slots WHERE date=? AND time IN ({marks}) AND is_booked=0) = ?
+                    RETURNING id, user_id, date, time, service_id,
+                      (SELECT name FROM services WHERE services.id = bookings.service_id),
+                      name, phone, status, created_at,
+                      NULL, NULL, 0;
+                    """,
+                    (
+                        user_id, date, time, service_id, name, phone, created_at_s,
+                        date,
+                        date, *required_slots, len(required_slots),
+                    ),
                 )
-                s = await cur.fetchone()
-                if s:
-                    await self.conn.execute(
-                        "UPDATE slots SET is_booked=1, booking_id=? WHERE id=?;",
-                        (booking_id, int(s["id"])),
-                    )
-
-            await self.conn.commit()
-        except Exception:
-            await self.conn.execute("ROLLBACK;")
-            raise
-
-        booking = await self.get_booking(booking_id)
-        if booking is None:
-            return False, "Не удалось создать запись. Попробуйте ещё раз."
+            except aiosqlite.IntegrityError as e:
+                if "bookings.user_id" in str(e):
+                    return False, "У вас уже есть активная запись. Сначала отмените её."
+                if "bookings.date, bookings.time" in str(e):
+                    return False, "Этот слот уже занят."
+                raise
+            if not rows:
+                # Разбираем причину отказа только на этом (редком) пути
+                return False, await self._booking_error(user_id, date, required_slots)
+            booking = self._row_to_booking(rows[0])
+
+            # 2) Бронируем все слоты
+            await self.conn.execute(
+                f"UPDATE slots SET is_booked=1, booking_id=? WHERE date=? AND time IN ({marks});",
+                (booking.id, date, *required_slots),
+            )
         return True, booking
 
+    async def _booking_error(self, user_id: int, date: str, required_slots: tuple[str, ...]) -> str:
+        """Текст ошибки для create_booking, когда INSERT не прошёл проверки."""
+        # Все факты одним запросом: строка на каждый найденный слот
+        # (или одна строка с NULL, если слотов нет)
+        marks = ",".join("?" * len(required_slots))
+        rows = await self.conn.execute_fetchall(
+            f"""
+            SELECT a.has_active, wd.is_closed, s.time, s.is_booked
+            FROM (SELECT EXISTS(SELECT 1 FROM bookings WHERE user_id=? AND status='active') AS has_active) a
+            LEFT JOIN working_days wd ON wd.date=?
+            LEFT JOIN slots s ON s.date=? AND s.time IN ({marks});
+            """,
+            (user_id, date, date, *required_slots),
+        )
+        if rows[0]["has_active"]:
+            return "У вас уже есть активная запись. Сначала отмените её."
+
+        if rows[0]["is_closed"] is None or int(rows[0]["is_closed"]) == 1:
+            return "Этот день недоступен для записи."
+
+        booked = {r["time"]: int(r["is_booked"]) for r in rows if r["time"] is not None}
+        start = required_slots[0]
+        if start not in booked:
+            return "Слот не найден."
+        if booked[start] == 1:
+            return "Этот слот уже занят."
+        for slot_time in required_slots[1:]:
+            if slot_time not in booked:
+                return f"Слот {slot_time} недоступен."
+            if booked[slot_time] == 1:
+                return f"Слот {slot_time} уже занят."
+        return "Не удалось создать запись. Попробуйте ещё раз."
+
     async def cancel_booking_by_user(self, user_id: int) -> Optional[Booking]:
-        booking = await self.get_user_active_booking(user_id)
-        if not booking:
-            return None
-        await self.cancel_booking_by_id(booking.id)
-        return booking
+        async with self.transaction():
+            booking_id = await self._get_user_active_booking_id(user_id)
+            if booking_id is None:
+                return None
+            return await self.cancel_booking_by_id(booking_id)
 
     async def cancel_booking_by_id(self, booking_id: int) -> Optional[Booking]:
-        await self.conn.execute("BEGIN IMMEDIATE;")
-        try:
-            booking = await self.get_booking(booking_id)
-            if not booking or booking.status != "active":
-                await self.conn.execute("ROLLBACK;")
+        """Отменить активную запись. Возвращает отменённую запись или None."""
+        async with self.transaction():
+            # помечаем запись отменённой; RETURNING заменяет предварительный SELECT,
+            # слоты освобождает триггер trg_bookings_release_slots
+            rows = await self.conn.execute_fetchall(
+                """
+                UPDATE bookings SET status='cancelled'
+                WHERE id=? AND status='active'
+                RETURNING id, user_id, date, time, service_id,
+                  (SELECT name FROM services WHERE services.id = bookings.service_id),
+                  name, phone, status, created_at,
+                  (SELECT job_id FROM reminders WHERE booking_id = bookings.id),
+                  (SELECT remind_at FROM reminders WHERE booking_id = bookings.id),
+                  COALESCE((SELECT remind_sent FROM reminders WHERE booking_id = bookings.id), 0);
+                """,
+                (booking_id,),
+            )
+            if not rows:
                 return None
+        return self._row_to_booking(rows[0])
 
-            # освобождаем слот
-            await self.conn.execute(
-                "UPDATE slots SET is_booked=0, booking_id=NULL WHERE booking_id=?;",
-                (booking_id,),
+    async def cancel_bookings_by_date(self, date: str) -> list[Booking]:
+        """
+        Отменить все активные записи на дату одним UPDATE вместо N отмен.
+        Строки напоминаний удаляются в той же транзакции. Возвращает отменённые записи
+        (status='cancelled', reminder_job_id — как было до отмены): задачи в планировщике
+        вызывающий снимает сам после COMMIT.
+        """
+        async with self.transaction():
+            # слоты освобождает триггер trg_bookings_release_slots
+            rows = await self.conn.execute_fetchall(
+                "UPDATE bookings SET status='cancelled' WHERE date=? AND status='active' RETURNING id;",
+                (date,),
+            )
+            if not rows:
+                return []
+
+            ids = json.dumps([r[0] for r in rows])
+            # читаем до удаления напоминаний, чтобы вернуть job_id; то же соединение — видим свой UPDATE
+            rows = await self.conn.execute_fetchall(
+                f"""
+                SELECT {BOOKING_COLS} FROM {BOOKING_FROM}
+                WHERE b.id IN (SELECT value FROM json_each(?))
+                ORDER BY b.time ASC;
+                """,
+                (ids,),
             )
-            # помечаем запись отменённой
             await self.conn.execute(
-                "UPDATE bookings SET status='cancelled' WHERE id=?;",
-                (booking_id,),
+                "DELETE FROM reminders WHERE booking_id IN (SELECT value FROM json_each(?));",
+                (ids,),
             )
-            await self.conn.commit()
-            return booking
-        except Exception:
-            await self.conn.execute("ROLLBACK;")
-            raise
+        return [self._row_to_booking(r) for r in rows]
 
     async def list_bookings_by_date(self, date: str) -> list[Booking]:
-        cur = await self.conn.execute(
-            """
-            SELECT b.*, s.name as service_name FROM bookings b
-            LEFT JOIN services s ON b.service_id = s.id
-            WHERE date=? AND status='active'
-            ORDER BY time ASC;
-            """,
-            (date,),
-        )
-        rows = await cur.fetchall()
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(
+                f"""
+                SELECT {BOOKING_COLS} FROM {BOOKING_FROM}
+                WHERE b.date=? AND b.status='active'
+                ORDER BY b.time ASC;
+                """,
+                (date,),
+            )
         return [self._row_to_booking(r) for r in rows]
 
+    async def list_booking_times(self, date: str) -> list[str]:
+        """Время активных записей на дату (поиск по индексу uniq_active_slot)."""
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(
+                "SELECT time FROM bookings WHERE date=? AND status='active' ORDER BY time ASC;",
+                (date,),
+            )
+        return [r[0] for r in rows]
+
+    async def load_day_view(self, date: str) -> tuple[bool, list[Slot], list[Booking]]:
+        """
+        (закрыт ли день, слоты, активные записи) для расписания на дату.
+        Три чтения идут параллельно через пул — задержка max(), а не сумма.
+        """
+        closed, slots, bookings = await asyncio.gather(
+            self.is_day_closed(date),
+            self.list_slots(date),
+            self.list_bookings_by_date(date),
+        )
+        return closed, slots, bookings
+
 
 
     async def set_booking_reminder(self, booking_id: int, job_id: str, remind_at: datetime) -> None:
-        await self.conn.execute(
-            "UPDATE bookings SET reminder_job_id=?, remind_at=?, remind_sent=0 WHERE id=?;",
-            (job_id, remind_at.strftime(DATETIME_FMT), booking_id),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            await self.conn.execute(
+                """
+                INSERT OR REPLACE INTO reminders(booking_id, job_id, remind_at, remind_sent)
+                VALUES (?, ?, ?, 0);
+                """,
+                (booking_id, job_id, self._fmt_dt(remind_at)),
+            )
 
     async def clear_booking_reminder(self, booking_id: int) -> None:
-        await self.conn.execute(
-            "UPDATE bookings SET reminder_job_id=NULL, remind_at=NULL, remind_sent=0 WHERE id=?;",
-            (booking_id,),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            await self.conn.execute(
+                "DELETE FROM reminders WHERE booking_id=?;",
+                (booking_id,),
+            )
 
     async def mark_reminder_sent(self, booking_id: int) -> None:
-        await self.conn.execute(
-            "UPDATE bookings SET remind_sent=1 WHERE id=?;",
-            (booking_id,),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            await self.conn.execute(
+                "UPDATE reminders SET remind_sent=1 WHERE booking_id=?;",
+                (booking_id,),
+            )
+
+    async def mark_reminders_sent(self, booking_ids: list[int]) -> None:
+        """Отметить несколько напоминаний отправленными одним UPDATE и одним commit."""
+        if not booking_ids:
+            return
+        async with self.transaction():
+            await self.conn.execute(
+                "UPDATE reminders SET remind_sent=1 WHERE booking_id IN (SELECT value FROM json_each(?));",
+                (json.dumps(booking_ids),),
+            )
 
     async def list_pending_reminders(self, now: datetime) -> list[Booking]:
-        cur = await self.conn.execute(
-            """
-            SELECT * FROM bookings
-            WHERE status='active'
-              AND reminder_job_id IS NOT NULL
-              AND remind_at IS NOT NULL
-              AND remind_sent=0;
-            """
-        )
-        rows = await cur.fetchall()
-        result: list[Booking] = []
-        for r in rows:
-            b = self._row_to_booking(r)
-            if not b.remind_at:
-                continue
-            try:
-                dt = datetime.strptime(b.remind_at, DATETIME_FMT)
-            except ValueError:
-                continue
-            if dt > now:
-                result.append(b)
-        return result
+        """
+        Неотправленные напоминания позже now.
+        remind_at хранится в DATETIME_FMT, поэтому строковое сравнение = хронологическое.
+        """
+        async with self._read() as conn:
+            cur = await conn.execute(
+                f"""
+                SELECT {BOOKING_COLS} FROM reminders r
+                JOIN bookings b ON b.id = r.booking_id
+                LEFT JOIN services s ON b.service_id = s.id
+                WHERE r.remind_sent=0
+                  AND r.remind_at > ?
+                  AND b.status='active';
+                """,
+                (self._fmt_dt(now),),
+            )
+            rows = await cur.fetchall()
+        return [self._row_to_booking(r) for r in rows]
 
    
 
-    async def list_services(self, active_only: bool = True) -> list[dict[str, Any]]:
-        """Получить список услуг."""
-        if active_only:
-            cur = await self.conn.execute(
-                "SELECT id, name, price, duration, is_active FROM services WHERE is_active=1 ORDER BY id;"
-            )
-        else:
-            cur = await self.conn.execute(
+    async def _services_by_id(self) -> dict[int, Service]:
+        """Все услуги по id — из кэша, если в нём нет устаревших данных."""
+        if self._services is not None and not self._services_changed:
+            return self._services
+        gen = self._services_gen
+        async with self._read() as conn:
+            rows = await conn.execute_fetchall(
                 "SELECT id, name, price, duration, is_active FROM services ORDER BY id;"
             )
-        rows = await cur.fetchall()
-        return [dict(r) for r in rows]
+        services = {r[0]: Service(*r) for r in rows}
+        # незакоммиченные изменения услуг и прочитанное до COMMIT не кэшируем
+        if not self._services_changed and gen == self._services_gen:
+            self._services = services
+        return services
+
+    async def list_services(self, active_only: bool = True) -> list[Service]:
+        """Получить список услуг."""
+        services = (await self._services_by_id()).values()
+        if active_only:
+            return [s for s in services if s.is_active]
+        return list(services)
 
-    async def get_service(self, service_id: int) -> Optional[dict[str, Any]]:
+    async def get_service(self, service_id: int) -> Optional[Service]:
         """Получить услугу по ID."""
-        cur = await self.conn.execute(
-            "SELECT id, name, price, duration, is_active FROM services WHERE id=?;",
-            (service_id,),
-        )
-        row = await cur.fetchone()
-        return dict(row) if row else None
+        return (await self._services_by_id()).get(service_id)
 
     async def get_service_duration(self, service_id: int) -> int:
         """Получить длительность услуги в минутах."""
-        cur = await self.conn.execute(
-            "SELECT duration FROM services WHERE id=?;",
-            (service_id,),
-        )
-        row = await cur.fetchone()
-        return int(row["duration"]) if row else 60
+        service = (await self._services_by_id()).get(service_id)
+        return int(service.duration) if service else 60
 
-    def _get_required_slots(self, start_time: str, duration_minutes: int) -> list[str]:
-        """
-        Рассчитать какие слоты нужны для услуги.
-        Слоты каждые 30 минут.
-        """
-        h, m = map(int, start_time.split(":"))
-        start_minutes = h * 60 + m
-        end_minutes = start_minutes + duration_minutes
-        
-        slots = []
-        current = start_minutes
-        while current < end_minutes:
-            h = current // 60
-            m = current % 60
-            if h > 23:
-                break
-            slots.append(f"{h:02d}:{m:02d}")
-            current += 30  
-        
+    @staticmethod
+    def _get_required_slots(start_time: str, duration_minutes: int) -> tuple[str, ...]:
+        """Слоты, которые займёт услуга: из готовой таблицы, иначе расчётом."""
+        slots = _REQUIRED_SLOTS.get((start_time, duration_minutes))
+        if slots is None:
+            slots = _compute_required_slots(start_time, duration_minutes)
         return slots
 
     async def add_service(self, name: str, price: int, duration: int) -> int:
         """Добавить услугу. Возвращает ID."""
-        cur = await self.conn.execute(
-            "INSERT INTO services(name, price, duration, is_active) VALUES (?, ?, ?, 1);",
-            (name, price, duration),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            cur = await self.conn.execute(
+                "INSERT INTO services(name, price, duration, is_active) VALUES (?, ?, ?, 1);",
+                (name, price, duration),
+            )
+            self._services_changed = True
         return int(cur.lastrowid)
 
     async def toggle_service(self, service_id: int, active: bool) -> None:
         """Включить/выключить услугу."""
-        await self.conn.execute(
-            "UPDATE services SET is_active=? WHERE id=?;",
-            (1 if active else 0, service_id),
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            await self.conn.execute(
+                "UPDATE services SET is_active=? WHERE id=?;",
+                (1 if active else 0, service_id),
+            )
+            self._services_changed = True
 
  
 
     @staticmethod
-    def _row_to_booking(row: aiosqlite.Row) -> Booking:
-        return Booking(
-            id=int(row["id"]),
-            user_id=int(row["user_id"]),
-            date=str(row["date"]),
-            time=str(row["time"]),
-            service_id=row["service_id"],
-            service_name=row["service_name"],
-            name=str(row["name"]),
-            phone=str(row["phone"]),
-            status=str(row["status"]),
-            created_at=str(row["created_at"]),
-            reminder_job_id=row["reminder_job_id"],
-            remind_at=row["remind_at"],
-            remind_sent=int(row["remind_sent"]),
+    def _fmt_dt(dt: datetime) -> str:
+        """То же, что dt.strftime(DATETIME_FMT), но без разбора формата в strftime."""
+        return (
+            f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} "
+            f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
         )
 
+    @staticmethod
+    def _row_to_booking(row: aiosqlite.Row) -> Booking:
+        # Порядок колонок BOOKING_COLS совпадает с полями Booking
+        return Booking(*row)
+
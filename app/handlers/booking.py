@@ -1,43 +1,69 @@
 from __future__ import annotations
 
+import asyncio
 import re
 from dataclasses import dataclass
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
+from time import monotonic
+from typing import Any, Coroutine
 
 from aiogram import Bot, Router, F
 from aiogram.enums import ChatMemberStatus
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
-from app.constants import DATE_FMT, MAX_DAYS_AHEAD
+from app.constants import DATE_FMT
 from app.db.sqlite import Booking, Database
 from app.fsm.states import BookingStates
 from app.keyboards.booking import BookingCB, TimeCB, cancel_confirm_kb, confirm_booking_kb, times_kb
-from app.keyboards.calendar import CalendarRange, CalCB, build_calendar
+from app.keyboards.calendar import NAV_DIRS, CalCB, build_calendar, day_ranges
 from app.keyboards.common import MenuCB, SubCB, main_menu_kb, subscribe_required_kb
 from app.keyboards.services import ServiceCB, services_kb
 from app.scheduler.reminders import ReminderScheduler
-from app.utils.format import esc, format_schedule
+from app.utils.format import esc, format_booking_summary, format_schedule
+from app.utils.messages import show_screen
+from app.utils.sender import NotificationSender
 from app.utils.time import tznow
 
 
+# Допустимый ввод телефона: цифры, +, скобки, дефис и пробелы
+PHONE_RE = re.compile(r"[0-9+()\-\s]{6,25}")
+
+# Сколько секунд доверяем ответу get_chat_member о подписке
+SUB_CACHE_TTL = 90.0
+# Размер кэша подписок, после которого из него чистятся протухшие записи
+SUB_CACHE_MAX = 10_000
+
+
 @dataclass(slots=True)
 class BookingDeps:
     cfg: object
     db: Database
     reminders: ReminderScheduler
+    sender: NotificationSender
 
 
-def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
+def get_router(*, cfg, db: Database, reminders: ReminderScheduler, sender: NotificationSender) -> Router:
     router = Router()
-    deps = BookingDeps(cfg=cfg, db=db, reminders=reminders)
+    deps = BookingDeps(cfg=cfg, db=db, reminders=reminders, sender=sender)
 
    
 
-    async def is_subscribed(bot: Bot, user_id: int) -> bool:
+    # user_id -> (monotonic(), подписан ли); ошибки API не кэшируем
+    sub_cache: dict[int, tuple[float, bool]] = {}
+
+    async def is_subscribed(bot: Bot, user_id: int, *, fresh: bool = False) -> bool:
+        """
+        Подписан ли пользователь на канал. Ответ кэшируется на SUB_CACHE_TTL,
+        fresh=True — спросить Telegram заново (кнопка «Проверить подписку»).
+        """
+        now = monotonic()
+        if not fresh:
+            hit = sub_cache.get(user_id)
+            if hit and now - hit[0] < SUB_CACHE_TTL:
+                return hit[1]
         try:
             member = await bot.get_chat_member(chat_id=cfg.channel_id, user_id=user_id)
-            return member.status in {ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR}
         except TelegramForbiddenError:
           
             return False
@@ -45,6 +71,13 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
             
             print(f"[DEBUG] get_chat_member failed: {e}, channel_id={cfg.channel_id}, user_id={user_id}")
             return False
+        ok = member.status in {ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR}
+        if len(sub_cache) >= SUB_CACHE_MAX:
+            # выкидываем протухшие записи, чтобы словарь не рос бесконечно
+            for uid in [uid for uid, (ts, _) in sub_cache.items() if now - ts >= SUB_CACHE_TTL]:
+                del sub_cache[uid]
+        sub_cache[user_id] = (now, ok)
+        return ok
 
     async def ensure_subscribed(call_or_msg, *, bot: Bot, user_id: int) -> bool:
         ok = await is_subscribed(bot, user_id)
@@ -63,35 +96,41 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
             await call_or_msg.answer(text, reply_markup=kb)
         return False
 
-    def rng_today() -> CalendarRange:
-        start = date.today()
-        end = start + timedelta(days=MAX_DAYS_AHEAD)
-        return CalendarRange(start=start, end=end)
+    # Ссылки на фоновые задачи: без них задачу может собрать GC до завершения
+    background: set[asyncio.Task] = set()
+
+    def run_in_background(coro: Coroutine[Any, Any, Any]) -> None:
+        """Запустить фоновую работу, не задерживая ответ пользователю. Ошибки — в лог."""
+        task = asyncio.create_task(coro)
+        background.add(task)
+        task.add_done_callback(background_done)
+
+    def background_done(task: asyncio.Task) -> None:
+        background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[ERROR] background task failed: {task.exception()!r}")
 
-    async def publish_schedule(bot: Bot, date_s: str) -> None:
-        is_closed = await db.is_day_closed(date_s)
+    async def publish_schedule(date_s: str) -> None:
+        """Поставить расписание дня в очередь на отправку в канал."""
+        is_closed, slots, bookings = await db.load_day_view(date_s)
         if is_closed:
-            await bot.send_message(chat_id=cfg.schedule_channel_id, text=f"⛔ <b>{date_s}</b> — день закрыт")
+            sender.enqueue(cfg.schedule_channel_id, f"⛔ <b>{date_s}</b> — день закрыт")
             return
-        
-        slots = await db.list_slots(date_s)
-        bookings = await db.list_bookings_by_date(date_s)
-        booked_by = {b.id: {"name": b.name, "service": b.service_name} for b in bookings}
-        text = format_schedule(date_s, slots, booked_by, public=True)  
-        await bot.send_message(chat_id=cfg.schedule_channel_id, text=text)
+
+        text = format_schedule(date_s, slots, bookings, public=True)  
+        sender.enqueue(cfg.schedule_channel_id, text)
 
     
 
     @router.callback_query(MenuCB.filter(F.action == "menu"))
-    async def menu_cb(call: CallbackQuery, state: FSMContext) -> None:
+    async def menu_cb(call: CallbackQuery, state: FSMContext, is_admin: bool) -> None:
         await state.clear()
-        is_admin = call.from_user.id == cfg.admin_id
-        await call.message.answer("Выберите действие:", reply_markup=main_menu_kb(is_admin=is_admin)) 
+        await show_screen(call, "Выберите действие:", reply_markup=main_menu_kb(is_admin=is_admin))
         await call.answer()
 
     @router.callback_query(SubCB.filter(F.action == "check"))
-    async def sub_check_cb(call: CallbackQuery, state: FSMContext) -> None:
-        ok = await is_subscribed(call.bot, call.from_user.id)
+    async def sub_check_cb(call: CallbackQuery, state: FSMContext, is_admin: bool) -> None:
+        ok = await is_subscribed(call.bot, call.from_user.id, fresh=True)
         if not ok:
             try:
                 await call.answer("Подписка не найдена. Подпишитесь и попробуйте ещё раз.", show_alert=True)
@@ -105,10 +144,10 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
        
             pass
         
-        await open_booking_calendar(call=call, state=state)
+        await open_booking_calendar(call=call, state=state, is_admin=is_admin)
 
     @router.callback_query(MenuCB.filter(F.action == "book"))
-    async def book_entry_cb(call: CallbackQuery, state: FSMContext) -> None:
+    async def book_entry_cb(call: CallbackQuery, state: FSMContext, is_admin: bool) -> None:
         await state.clear()
         ok = await ensure_subscribed(call, bot=call.bot, user_id=call.from_user.id)
         if not ok:
@@ -116,38 +155,34 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
 
         services = await db.list_services(active_only=True)
         if not services:
-            await call.message.answer("Услуги временно недоступны. Попробуйте позже.", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+            await call.message.answer("Услуги временно недоступны. Попробуйте позже.", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
             await call.answer()
             return
         await state.set_state(BookingStates.choosing_service)
-        await call.message.answer("📋 <b>Выберите услугу:</b>", reply_markup=services_kb(services))  
+        await show_screen(call, "📋 <b>Выберите услугу:</b>", reply_markup=services_kb(services))
         await call.answer()
 
     @router.callback_query(MenuCB.filter(F.action == "my"))
-    async def my_booking_cb(call: CallbackQuery, state: FSMContext) -> None:
+    async def my_booking_cb(call: CallbackQuery, state: FSMContext, is_admin: bool) -> None:
         await state.clear()
         b = await db.get_user_active_booking(call.from_user.id)
         if not b:
-            await call.message.answer("У вас нет активной записи.", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+            await call.message.answer("У вас нет активной записи.", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
             await call.answer()
             return
         text = (
-            "📌 <b>Ваша запись</b>\n\n"
-            f"Дата: <b>{esc(b.date)}</b>\n"
-            f"Время: <b>{esc(b.time)}</b>\n"
-            f"Имя: <b>{esc(b.name)}</b>\n"
-            f"Телефон: <code>{esc(b.phone)}</code>\n\n"
-            "Хотите отменить запись?"
+            format_booking_summary("📌 <b>Ваша запись</b>", b.date, b.time, b.name, b.phone)
+            + "\n\nХотите отменить запись?"
         )
         await state.set_state(BookingStates.cancelling_confirm)
-        await state.update_data(cancel_booking_id=b.id)
-        await call.message.answer(text, reply_markup=cancel_confirm_kb())  # type: ignore[union-attr]
+        await state.set_data({"cancel_booking_id": b.id})  # состояние только что очищено
+        await show_screen(call, text, reply_markup=cancel_confirm_kb())
         await call.answer()
 
     # -------- service selection --------
 
     @router.callback_query(ServiceCB.filter())
-    async def service_selected_cb(call: CallbackQuery, callback_data: ServiceCB, state: FSMContext) -> None:
+    async def service_selected_cb(call: CallbackQuery, callback_data: ServiceCB, state: FSMContext, is_admin: bool) -> None:
         ok = await ensure_subscribed(call, bot=call.bot, user_id=call.from_user.id)
         if not ok:
             return
@@ -157,24 +192,19 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
             await call.answer("Услуга не найдена.", show_alert=True)
             return
 
-        await state.update_data(service_id=service["id"], service_name=service["name"])
-        await open_booking_calendar(call=call, state=state)
+        await state.update_data(service_id=service.id, service_name=service.name)
+        await open_booking_calendar(call=call, state=state, is_admin=is_admin)
 
     # -------- calendar / times --------
 
-    async def open_booking_calendar(call: CallbackQuery, state: FSMContext | None) -> None:
-        ok = await ensure_subscribed(call, bot=call.bot, user_id=call.from_user.id)
-        if not ok:
-            return
-
-        rng = rng_today()
-        start_s = rng.start.strftime(DATE_FMT)
-        end_s = rng.end.strftime(DATE_FMT)
-        available_dates = set(await db.list_available_dates(start_s, end_s))
-        open_dates = set(await db.list_open_dates(start_s, end_s))
+    async def open_booking_calendar(call: CallbackQuery, state: FSMContext | None, is_admin: bool) -> None:
+        """Календарь записи. Подписку уже проверил вызывающий (sub_check_cb / service_selected_cb)."""
+        ranges = day_ranges()
+        rng = ranges.rng
+        available_dates, open_dates = await db.list_calendar_dates(ranges.start_s, ranges.end_s)
 
         if not available_dates:
-            await call.message.answer("Пока нет доступных слотов. Попробуйте позже.", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+            await call.message.answer("Пока нет доступных слотов. Попробуйте позже.", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
             await call.answer()
             return
 
@@ -189,7 +219,7 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
         )
         if state is not None:
             await state.set_state(BookingStates.choosing_date)
-        await call.message.answer("🗓 <b>Выберите дату для записи</b>", reply_markup=cal_kb)  # type: ignore[union-attr]
+        await show_screen(call, "🗓 <b>Выберите дату для записи</b>", reply_markup=cal_kb)
         await call.answer()
 
     @router.callback_query(CalCB.filter(F.scope == "user"))
@@ -198,14 +228,12 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
         if not ok:
             return
 
-        rng = rng_today()
-        start_s = rng.start.strftime(DATE_FMT)
-        end_s = rng.end.strftime(DATE_FMT)
-        available_dates = set(await db.list_available_dates(start_s, end_s))
-        open_dates = set(await db.list_open_dates(start_s, end_s))
+        ranges = day_ranges()
+        rng = ranges.rng
+        available_dates, open_dates = await db.list_calendar_dates(ranges.start_s, ranges.end_s)
 
         # Навигация
-        if callback_data.d == 0 and callback_data.nav in {"prev", "next"}:
+        if callback_data.d == 0 and callback_data.nav in NAV_DIRS:
             month = date(callback_data.y, callback_data.m, 1)
             cal_kb = build_calendar(
                 scope="user",
@@ -239,11 +267,9 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
             return
 
         await state.set_state(BookingStates.choosing_time)
-        await state.update_data(date=selected)
-        await call.message.answer(  # type: ignore[union-attr]
-            f"🕒 <b>{esc(selected)}</b>\nВыберите время:",
-            reply_markup=times_kb(selected, free_times),
-        )
+        # data уже прочитаны выше — пишем целиком, без повторного чтения в update_data
+        await state.set_data({**data, "date": selected})
+        await show_screen(call, f"🕒 <b>{esc(selected)}</b>\nВыберите время:", reply_markup=times_kb(selected, free_times))
         await call.answer()
 
     @router.callback_query(TimeCB.filter())
@@ -260,7 +286,7 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
             await call.answer("Этот слот уже занят. Выберите другое время.", show_alert=True)
             return
 
-        await state.update_data(date=callback_data.date, time=time_s)
+        await state.set_data({**data, "date": callback_data.date, "time": time_s})
         await state.set_state(BookingStates.entering_name)
         await call.message.answer("Введите <b>имя</b>:")  # type: ignore[union-attr]
         await call.answer()
@@ -280,7 +306,7 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
     @router.message(BookingStates.entering_phone)
     async def phone_msg(message: Message, state: FSMContext) -> None:
         phone = (message.text or "").strip()
-        if not re.fullmatch(r"[0-9+()\-\s]{6,25}", phone):
+        if not PHONE_RE.fullmatch(phone):
             await message.answer("Номер телефона выглядит некорректно. Введите ещё раз:")
             return
         data = await state.get_data()
@@ -289,27 +315,22 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
         name = str(data.get("name", ""))
         service_name = str(data.get("service_name", ""))
 
-        await state.update_data(phone=phone)
+        await state.set_data({**data, "phone": phone})
         await state.set_state(BookingStates.confirming)
 
-        text = (
-            "✅ <b>Подтвердите запись</b>\n\n"
-            f"Услуга: <b>{esc(service_name)}</b>\n"
-            f"Дата: <b>{esc(date_s)}</b>\n"
-            f"Время: <b>{esc(time_s)}</b>\n"
-            f"Имя: <b>{esc(name)}</b>\n"
-            f"Телефон: <code>{esc(phone)}</code>"
+        text = format_booking_summary(
+            "✅ <b>Подтвердите запись</b>", date_s, time_s, name, phone, service=service_name
         )
         await message.answer(text, reply_markup=confirm_booking_kb())
 
     @router.callback_query(BookingCB.filter(F.action == "cancel"))
-    async def booking_cancel_cb(call: CallbackQuery, state: FSMContext) -> None:
+    async def booking_cancel_cb(call: CallbackQuery, state: FSMContext, is_admin: bool) -> None:
         await state.clear()
-        await call.message.answer("Ок, отменено.", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+        await call.message.answer("Ок, отменено.", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
         await call.answer()
 
     @router.callback_query(BookingCB.filter(F.action == "confirm"))
-    async def booking_confirm_cb(call: CallbackQuery, state: FSMContext) -> None:
+    async def booking_confirm_cb(call: CallbackQuery, state: FSMContext, is_admin: bool) -> None:
         ok = await ensure_subscribed(call, bot=call.bot, user_id=call.from_user.id)
         if not ok:
             return
@@ -322,10 +343,9 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
         service_id = data.get("service_id")
 
         # финальная проверка: есть ли активная запись
-        already = await db.get_user_active_booking(call.from_user.id)
-        if already:
+        if await db.has_active_booking(call.from_user.id):
             await state.clear()
-            await call.message.answer("У вас уже есть активная запись. Сначала отмените её.", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+            await call.message.answer("У вас уже есть активная запись. Сначала отмените её.", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
             await call.answer()
             return
 
@@ -340,41 +360,31 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
             service_id=int(service_id) if service_id else None,
         )
         if not ok2:
-            await call.message.answer(f"❌ {esc(str(res))}", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+            await call.message.answer(f"❌ {esc(str(res))}", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
             await state.clear()
             await call.answer()
             return
 
         booking: Booking = res  # type: ignore[assignment]
-        service_name = data.get("service_name", "—")
+        service_name = str(data.get("service_name", "—"))
+        summary = (booking.date, booking.time, booking.name, booking.phone)
 
         # Сообщение пользователю
         await call.message.answer(  # type: ignore[union-attr]
-            "🎉 <b>Запись подтверждена!</b>\n\n"
-            f"Услуга: <b>{esc(str(service_name))}</b>\n"
-            f"Дата: <b>{esc(booking.date)}</b>\n"
-            f"Время: <b>{esc(booking.time)}</b>\n"
-            f"Имя: <b>{esc(booking.name)}</b>\n"
-            f"Телефон: <code>{esc(booking.phone)}</code>",
-            reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id),
+            format_booking_summary("🎉 <b>Запись подтверждена!</b>", *summary, service=service_name),
+            reply_markup=main_menu_kb(is_admin=is_admin),
         )
 
         # Сообщение админу
         u = call.from_user
         uname = f"@{u.username}" if u.username else "—"
         admin_text = (
-            "🆕 <b>Новая запись</b>\n\n"
-            f"Услуга: <b>{esc(str(service_name))}</b>\n"
-            f"Дата: <b>{esc(booking.date)}</b>\n"
-            f"Время: <b>{esc(booking.time)}</b>\n"
-            f"Имя: <b>{esc(booking.name)}</b>\n"
-            f"Телефон: <code>{esc(booking.phone)}</code>\n"
-            f"Пользователь: <code>{u.id}</code> ({esc(uname)})"
+            format_booking_summary("🆕 <b>Новая запись</b>", *summary, service=service_name)
+            + f"\nПользователь: <code>{u.id}</code> ({esc(uname)})"
         )
-        await call.bot.send_message(chat_id=cfg.admin_id, text=admin_text)
-
-        # Канал расписания
-        await publish_schedule(call.bot, booking.date)
+        # Админу и в канал расписания — через очередь уведомлений, пользователь ответ уже получил
+        sender.enqueue(cfg.admin_id, admin_text)
+        run_in_background(publish_schedule(booking.date))
 
         await state.clear()
         await call.answer()
@@ -382,43 +392,39 @@ def get_router(*, cfg, db: Database, reminders: ReminderScheduler) -> Router:
     # -------- Cancel booking (FSM) --------
 
     @router.callback_query(BookingCB.filter(F.action == "confirm_cancel"))
-    async def cancel_confirm_cb(call: CallbackQuery, state: FSMContext) -> None:
+    async def cancel_confirm_cb(call: CallbackQuery, state: FSMContext, is_admin: bool) -> None:
         data = await state.get_data()
         booking_id = int(data.get("cancel_booking_id", 0) or 0)
         b = await db.get_booking(booking_id)
         if not b or b.user_id != call.from_user.id or b.status != "active":
             await state.clear()
-            await call.message.answer("Запись не найдена.", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+            await call.message.answer("Запись не найдена.", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
             await call.answer()
             return
 
-        cancelled = await db.cancel_booking_by_id(booking_id)
+        # отмена и очистка напоминания в БД — одной транзакцией
+        async with db.transaction():
+            cancelled = await db.cancel_booking_by_id(booking_id)
+            if cancelled:
+                await db.clear_booking_reminder(booking_id)
         if not cancelled:
             await state.clear()
-            await call.message.answer("Не удалось отменить запись.", reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id))  # type: ignore[union-attr]
+            await call.message.answer("Не удалось отменить запись.", reply_markup=main_menu_kb(is_admin=is_admin))  # type: ignore[union-attr]
             await call.answer()
             return
-
-        # удаляем напоминание
-        await deps.reminders.delete_for_booking(b)
+        # задачу в планировщике снимаем только после COMMIT: при откате напоминание должно остаться
+        deps.reminders.remove_job(b)
 
         await call.message.answer(  # type: ignore[union-attr]
             "✅ Запись отменена. Слот снова доступен.",
-            reply_markup=main_menu_kb(is_admin=call.from_user.id == cfg.admin_id),
+            reply_markup=main_menu_kb(is_admin=is_admin),
         )
 
-        await call.bot.send_message(
-            chat_id=cfg.admin_id,
-            text=(
-                "❌ <b>Отмена записи</b>\n\n"
-                f"Дата: <b>{esc(b.date)}</b>\n"
-                f"Время: <b>{esc(b.time)}</b>\n"
-                f"Имя: <b>{esc(b.name)}</b>\n"
-                f"Телефон: <code>{esc(b.phone)}</code>"
-            ),
+        sender.enqueue(
+            cfg.admin_id,
+            format_booking_summary("❌ <b>Отмена записи</b>", b.date, b.time, b.name, b.phone),
         )
-
-        await publish_schedule(call.bot, b.date)
+        run_in_background(publish_schedule(b.date))
 
         await state.clear()
         await call.answer()
@@ -6,17 +6,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
 from app.keyboards.common import main_menu_kb
-from config import load_config
 
 router = Router()
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext) -> None:
+async def cmd_start(message: Message, state: FSMContext, is_admin: bool) -> None:
     await state.clear()
-    cfg = load_config()
-    is_admin = bool(message.from_user and message.from_user.id == cfg.admin_id)
-   
     text = (
         "👋 <b>Привет!</b>\n\n"
         "Я бот для записи к мастеру.\n"
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+from functools import cache, lru_cache
+from typing import Iterable
+
 from aiogram.filters.callback_data import CallbackData
-from aiogram.types import InlineKeyboardMarkup
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from app.keyboards.common import MenuCB
+from app.constants import WORK_TIMES
+from app.db.sqlite import Service
+from app.keyboards.common import MenuCB, button_grid
 
 
 class AdminCB(CallbackData, prefix="adm"):
@@ -27,12 +32,21 @@ class AdminTimeCB(CallbackData, prefix="atime"):
         time_safe = time.replace(":", "-")
         return cls(date=date, time=time_safe, mode=mode).pack()
 
+    @classmethod
+    def pack_times(cls, date: str, times: Iterable[str], mode: str) -> list[str]:
+        """pack_time для нескольких времён на одну дату: проверка один раз, дальше склейка строк"""
+        sep = cls.__separator__
+        head, mode_s = cls(date=date, time="", mode=mode).pack().rsplit(sep, 1)
+        return [f"{head}{t.replace(':', '-')}{sep}{mode_s}" for t in times]
+
     def unpack_time(self) -> str:
         """Распаковать время, заменив - на :"""
         return self.time.replace("-", ":")
 
 
+@cache
 def admin_menu_kb() -> InlineKeyboardMarkup:
+    """Статичное меню админки: строится один раз, разметка общая — не изменять."""
     kb = InlineKeyboardBuilder()
     kb.button(text="➕ Добавить рабочий день", callback_data=AdminCB(action="add_day").pack())
     kb.button(text="⛔ Закрыть день полностью", callback_data=AdminCB(action="close_day").pack())
@@ -47,48 +61,39 @@ def admin_menu_kb() -> InlineKeyboardMarkup:
     return kb.as_markup()
 
 
-def services_admin_kb(services: list[dict]) -> InlineKeyboardMarkup:
+def services_admin_kb(services: list[Service]) -> InlineKeyboardMarkup:
     """Клавиатура управления услугами для админа."""
-    kb = InlineKeyboardBuilder()
-    for s in services:
-        status = "✅" if s["is_active"] else "❌"
-        kb.button(
-            text=f"{status} {s['name']} — {s['price']}₽",
-            callback_data=AdminServiceCB(service_id=s["id"], action="toggle").pack(),
+    buttons = [
+        InlineKeyboardButton(
+            text=f"{'✅' if s.is_active else '❌'} {s.name} — {s.price}₽",
+            callback_data=AdminServiceCB(service_id=s.id, action="toggle").pack(),
         )
-    kb.adjust(1)
-    kb.row()
-    kb.button(text="⬅️ Назад", callback_data=AdminCB(action="menu").pack())
-    return kb.as_markup()
+        for s in services
+    ]
+    back = InlineKeyboardButton(text="⬅️ Назад", callback_data=AdminCB(action="menu").pack())
+    return button_grid(buttons, 1, back)
 
 
+@lru_cache(maxsize=64)
 def admin_times_grid(date: str, *, mode: str) -> InlineKeyboardMarkup:
     """
     Сетка времени каждые 30 минут (09:00 - 20:00).
     Используется для добавления слотов (и потенциально других операций).
+    Зависит только от даты и режима — кэшируется, разметка общая — не изменять.
     """
-    kb = InlineKeyboardBuilder()
-    hours = list(range(9, 21))
-    times: list[str] = []
-    for h in hours:
-        for m in (0, 30):
-            if h == 20 and m == 30:
-                continue
-            times.append(f"{h:02d}:{m:02d}")
-    for t in times:
-        kb.button(text=t, callback_data=AdminTimeCB.pack_time(date=date, time=t, mode=mode))
-    kb.adjust(4)
-    kb.row()
-    kb.button(text="⬅️ Назад", callback_data=AdminCB(action="menu").pack())
-    return kb.as_markup()
+    buttons = [
+        InlineKeyboardButton(text=t, callback_data=data)
+        for t, data in zip(WORK_TIMES, AdminTimeCB.pack_times(date, WORK_TIMES, mode))
+    ]
+    back = InlineKeyboardButton(text="⬅️ Назад", callback_data=AdminCB(action="menu").pack())
+    return button_grid(buttons, 4, back)
 
 
 def admin_existing_slots_kb(date: str, times: list[str], *, mode: str) -> InlineKeyboardMarkup:
-    kb = InlineKeyboardBuilder()
-    for t in times:
-        kb.button(text=f"🕒 {t}", callback_data=AdminTimeCB.pack_time(date=date, time=t, mode=mode))
-    kb.adjust(2)
-    kb.row()
-    kb.button(text="⬅️ Назад", callback_data=AdminCB(action="menu").pack())
-    return kb.as_markup()
+    buttons = [
+        InlineKeyboardButton(text=f"🕒 {t}", callback_data=data)
+        for t, data in zip(times, AdminTimeCB.pack_times(date, times, mode))
+    ]
+    back = InlineKeyboardButton(text="⬅️ Назад", callback_data=AdminCB(action="menu").pack())
+    return button_grid(buttons, 2, back)
 
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+from typing import Iterable
+
 from aiogram.filters.callback_data import CallbackData
-from aiogram.types import InlineKeyboardMarkup
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from app.keyboards.common import MenuCB
+from app.keyboards.common import MenuCB, button_grid
 
 
 class TimeCB(CallbackData, prefix="time"):
@@ -17,6 +19,12 @@ class TimeCB(CallbackData, prefix="time"):
         time_safe = time.replace(":", "-")
         return cls(date=date, time=time_safe).pack()
 
+    @classmethod
+    def pack_times(cls, date: str, times: Iterable[str]) -> list[str]:
+        """pack_time для нескольких времён на одну дату: проверка один раз, дальше склейка строк"""
+        head = cls(date=date, time="").pack()
+        return [head + t.replace(":", "-") for t in times]
+
     def unpack_time(self) -> str:
         """Распаковать время, заменив - на :"""
         return self.time.replace("-", ":")
@@ -27,13 +35,12 @@ class BookingCB(CallbackData, prefix="book"):
 
 
 def times_kb(date: str, times: list[str]) -> InlineKeyboardMarkup:
-    kb = InlineKeyboardBuilder()
-    for t in times:
-        kb.button(text=f"🕒 {t}", callback_data=TimeCB.pack_time(date=date, time=t))
-    kb.adjust(2)
-    kb.row()
-    kb.button(text="⬅️ В меню", callback_data=MenuCB(action="menu").pack())
-    return kb.as_markup()
+    buttons = [
+        InlineKeyboardButton(text=f"🕒 {t}", callback_data=data)
+        for t, data in zip(times, TimeCB.pack_times(date, times))
+    ]
+    back = InlineKeyboardButton(text="⬅️ В меню", callback_data=MenuCB(action="menu").pack())
+    return button_grid(buttons, 2, back)
 
 
 def confirm_booking_kb() -> InlineKeyboardMarkup:
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import calendar as pycal
+from collections.abc import Set as AbstractSet
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 
 from aiogram.filters.callback_data import CallbackData
-from aiogram.types import InlineKeyboardMarkup
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from app.constants import DATE_FMT
+from app.constants import MAX_DAYS_AHEAD
+from app.keyboards.common import button_grid
 
 
 class CalCB(CallbackData, prefix="cal"):
@@ -19,139 +21,206 @@ class CalCB(CallbackData, prefix="cal"):
     nav: str  # prev/next/none
 
 
+# Сколько разных месяцев/наборов дат держать в кэше разметки календаря
+CALENDAR_CACHE_SIZE = 256
+
+# значения nav, при которых листаем месяц
+NAV_DIRS: frozenset[str] = frozenset(("prev", "next"))
+
+
 @dataclass(slots=True)
 class CalendarRange:
     start: date
     end: date
 
 
+@dataclass(slots=True)
+class DayRanges:
+    """Диапазоны календаря на один день. Объект общий — не изменять."""
+    rng: CalendarRange  # запись: сегодня .. +MAX_DAYS_AHEAD
+    start_s: str  # границы rng строками в DATE_FMT — для запросов в БД
+    end_s: str
+    admin_rng: CalendarRange  # админский: с 1-го числа месяца до rng.end
+    admin_dates: frozenset[str]  # все даты админского диапазона
+
+
+# (ordinal дня, диапазоны) — пересчитываются раз в сутки, общий кэш для записи и админки
+_DAY_RANGES: tuple[int, DayRanges] | None = None
+
+
+def day_ranges() -> DayRanges:
+    """Диапазоны календаря на сегодня. Новый день — пересчёт, иначе готовый объект."""
+    global _DAY_RANGES
+    today = date.today()
+    if _DAY_RANGES is None or _DAY_RANGES[0] != today.toordinal():
+        end = today + timedelta(days=MAX_DAYS_AHEAD)
+        admin_rng = CalendarRange(start=today.replace(day=1), end=end)
+        # DATE_FMT — это ISO (YYYY-MM-DD), isoformat() быстрее strftime
+        admin_dates = frozenset(
+            date.fromordinal(o).isoformat() for o in range(admin_rng.start.toordinal(), end.toordinal() + 1)
+        )
+        ranges = DayRanges(
+            rng=CalendarRange(start=today, end=end),
+            start_s=today.isoformat(),
+            end_s=end.isoformat(),
+            admin_rng=admin_rng,
+            admin_dates=admin_dates,
+        )
+        _DAY_RANGES = (today.toordinal(), ranges)
+    return _DAY_RANGES[1]
+
+
 def _month_shift(d: date, delta_months: int) -> date:
-    y = d.year
-    m = d.month + delta_months
-    while m < 1:
-        m += 12
-        y -= 1
-    while m > 12:
-        m -= 12
-        y += 1
-    return date(y, m, 1)
+    # месяцы от начала эры: divmod сам переносит год в обе стороны
+    y, m0 = divmod(d.year * 12 + d.month - 1 + delta_months, 12)
+    return date(y, m0 + 1, 1)
 
 
-def build_calendar(
-    *,
-    scope: str,
-    month: date,
-    allowed_dates: set[str],
-    rng: CalendarRange,
-    title: str,
-    dates_with_slots: set[str] = None,
-    closed_dates: set[str] = None,
-    open_dates: set[str] = None,
-) -> InlineKeyboardMarkup:
+_EMPTY: frozenset[str] = frozenset()
+
+_WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+# pycal.month_name на каждый индекс зовёт strftime по локали (и даёт английские названия)
+_MONTH_NAMES = (
+    "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
+)
+
+
+@lru_cache(maxsize=32)
+def _month_cells(year: int, month: int) -> tuple[tuple[int, str, str], ...]:
     """
-    Inline календарь на месяц.
-    allowed_dates: множество YYYY-MM-DD, которые можно нажимать (есть свободные слоты).
-    dates_with_slots: множество YYYY-MM-DD, где есть слоты (для определения занятых дней).
-    closed_dates: множество YYYY-MM-DD, которые закрыты.
-    open_dates: множество YYYY-MM-DD, которые открыты (is_closed=0).
-    rng: диапазон, в котором разрешена навигация.
+    Ячейки сетки месяца по порядку (неделя с понедельника): (номер дня, YYYY-MM-DD, день недели).
+    Пустые ячейки до/после месяца — (0, "", день недели). Сетка от наборов дат не зависит.
     """
-    kb = InlineKeyboardBuilder()
+    prefix = f"{year:04d}-{month:02d}-"
+    return tuple(
+        (day_num, f"{prefix}{day_num:02d}" if day_num else "", weekday)
+        for week_days in pycal.Calendar(firstweekday=0).monthdayscalendar(year, month)
+        # неделя с понедельника — номер колонки и есть день недели
+        for weekday, day_num in zip(_WEEKDAYS, week_days)
+    )
 
-    if dates_with_slots is None:
-        dates_with_slots = allowed_dates
 
-    if closed_dates is None:
-        closed_dates = set()
+def _frozen(dates: AbstractSet[str]) -> frozenset[str]:
+    # из БД приходят frozenset — без копии; хэш frozenset считается один раз
+    return dates if isinstance(dates, frozenset) else frozenset(dates)
 
-    if open_dates is None:
-        open_dates = set()
 
-    month_name = f"{pycal.month_name[month.month]} {month.year}"
-    kb.button(
-        text=f"📅 {title}: {month_name}",
-        callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack(),
-    )
-    kb.adjust(1)
-
-    cal = pycal.Calendar(firstweekday=0)
-    for week_days in cal.monthdayscalendar(month.year, month.month):
-        for day_num in week_days:
-            if day_num == 0:
-                kb.button(
-                    text=" ",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack(),
-                )
-                continue
-            day_date = date(month.year, month.month, day_num)
-            if day_date < rng.start or day_date > rng.end:
-                kb.button(
-                    text="—",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack(),
-                )
-                continue
-            day_str = day_date.strftime(DATE_FMT)
-            weekday = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"][day_date.weekday()]
-            
-            if day_str in closed_dates and day_str not in allowed_dates:
-                # День закрыт админом и не в allowed (не для открытия)
-                kb.button(
-                    text=f"⛔ {weekday}",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack(),
-                )
-            elif day_str in closed_dates and day_str in allowed_dates:
+@lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+def _calendar_markup(
+    scope: str,
+    month: date,
+    allowed_dates: frozenset[str],
+    rng_start: date,
+    rng_end: date,
+    title: str,
+    dates_with_slots: frozenset[str],
+    closed_dates: frozenset[str],
+    open_dates: frozenset[str],
+) -> InlineKeyboardMarkup:
+    # Payload собираем f-строкой в формате CalCB.pack() (prefix:scope:y:m:d:nav) — без
+    # pydantic-валидации на каждую кнопку. Через pack() один раз проходит общий payload
+    # некликабельных кнопок — он же проверяет scope (остальные поля — числа и константы).
+    sep = CalCB.__separator__
+
+    def packed(y: int, m: int, d: int, nav: str) -> str:
+        return f"{CalCB.__prefix__}{sep}{scope}{sep}{y}{sep}{m}{sep}{d}{sep}{nav}"
+
+    nop_cb = CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack()
+
+    def button(text: str, callback_data: str = nop_cb) -> InlineKeyboardButton:
+        return InlineKeyboardButton(text=text, callback_data=callback_data)
+
+    def day_button(text: str, day_num: int) -> InlineKeyboardButton:
+        return InlineKeyboardButton(text=text, callback_data=packed(month.year, month.month, day_num, "none"))
+
+    month_name = f"{_MONTH_NAMES[month.month]} {month.year}"
+    buttons = [button(f"📅 {title}: {month_name}")]
+
+    # диапазон rng в номерах дней этого месяца (могут выйти за 1..31 — тогда весь месяц внутри/снаружи)
+    month_ord = month.toordinal() - 1
+    first_day = rng_start.toordinal() - month_ord
+    last_day = rng_end.toordinal() - month_ord
+    for day_num, day_str, weekday in _month_cells(month.year, month.month):
+        if day_num == 0:
+            buttons.append(button(" "))
+            continue
+        if day_num < first_day or day_num > last_day:
+            buttons.append(button("—"))
+            continue
+
+        # каждое множество проверяем не больше одного раза
+        allowed = day_str in allowed_dates
+        if day_str in closed_dates:
+            if allowed:
                 # День закрыт, но в allowed — значит нужно его открыть (admin action)
-                kb.button(
-                    text=f"⛔ {day_num} {weekday}",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=day_num, nav="none").pack(),
-                )
-            elif day_str in allowed_dates:
-                # День в allowed — кликабельный (для open_day/close_day или есть свободные слоты)
-                kb.button(
-                    text=f"✅ {day_num} {weekday}",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=day_num, nav="none").pack(),
-                )
-            elif day_str in open_dates:
-                # День открыт (не в allowed, значит нет свободных слотов, но для просмотра показываем ✅)
-                kb.button(
-                    text=f"✅ {day_num} {weekday}",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=day_num, nav="none").pack(),
-                )
-            elif day_str in dates_with_slots:
-                # Есть слоты, но день не добавлен в working_days
-                kb.button(
-                    text=f"🈵 {day_num} {weekday}",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=day_num, nav="none").pack(),
-                )
+                buttons.append(day_button(f"⛔ {day_num} {weekday}", day_num))
             else:
-                # Нет слотов или день не добавлен
-                kb.button(
-                    text=f"❌ {weekday}",
-                    callback_data=CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack(),
-                )
-        kb.adjust(7)
+                # День закрыт админом и не в allowed (не для открытия)
+                buttons.append(button(f"⛔ {weekday}"))
+        elif allowed or day_str in open_dates:
+            # allowed — кликабельный (open_day/close_day или есть свободные слоты);
+            # открыт, но не в allowed (нет свободных слотов) — для просмотра тоже ✅
+            buttons.append(day_button(f"✅ {day_num} {weekday}", day_num))
+        elif day_str in dates_with_slots:
+            # Есть слоты, но день не добавлен в working_days
+            buttons.append(day_button(f"🈵 {day_num} {weekday}", day_num))
+        else:
+            # Нет слотов или день не добавлен
+            buttons.append(button(f"❌ {weekday}"))
 
     # Навигация
     prev_month = _month_shift(month, -1)
     next_month = _month_shift(month, +1)
 
-    can_prev = prev_month >= date(rng.start.year, rng.start.month, 1)
-    can_next = next_month <= date(rng.end.year, rng.end.month, 1)
+    can_prev = prev_month >= date(rng_start.year, rng_start.month, 1)
+    can_next = next_month <= date(rng_end.year, rng_end.month, 1)
 
-    kb.row()
-    kb.button(
-        text="⬅️",
-        callback_data=CalCB(scope=scope, y=prev_month.year, m=prev_month.month, d=0, nav="prev").pack()
-        if can_prev
-        else CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack(),
-    )
-    kb.button(
-        text="➡️",
-        callback_data=CalCB(scope=scope, y=next_month.year, m=next_month.month, d=0, nav="next").pack()
-        if can_next
-        else CalCB(scope=scope, y=month.year, m=month.month, d=0, nav="none").pack(),
-    )
-    kb.adjust(2)
+    buttons.append(button(
+        "⬅️",
+        packed(prev_month.year, prev_month.month, 0, "prev") if can_prev else nop_cb,
+    ))
+    buttons.append(button(
+        "➡️",
+        packed(next_month.year, next_month.month, 0, "next") if can_next else nop_cb,
+    ))
 
-    return kb.as_markup()
+    # Раскладка как была с InlineKeyboardBuilder (итоговый adjust(2)): все кнопки по две в ряд.
+    # Сам builder не используем — он копирует всю разметку на каждой добавленной кнопке.
+    return button_grid(buttons, 2)
 
+
+def build_calendar(
+    *,
+    scope: str,
+    month: date,
+    allowed_dates: AbstractSet[str],
+    rng: CalendarRange,
+    title: str,
+    dates_with_slots: AbstractSet[str] = None,
+    closed_dates: AbstractSet[str] = None,
+    open_dates: AbstractSet[str] = None,
+) -> InlineKeyboardMarkup:
+    """
+    Inline календарь на месяц.
+    allowed_dates: множество YYYY-MM-DD, которые можно нажимать (есть свободные слоты).
+    dates_with_slots: множество YYYY-MM-DD, где есть слоты (для определения занятых дней).
+    closed_dates: множество YYYY-MM-DD, которые закрыты.
+    open_dates: множество YYYY-MM-DD, которые открыты (is_closed=0).
+    rng: диапазон, в котором разрешена навигация.
+
+    Разметка кэшируется по всем входам (множества дат — часть ключа, поэтому
+    при изменении расписания ключ меняется сам). Возвращаемый объект общий — не изменять.
+    """
+    allowed = _frozen(allowed_dates)
+    return _calendar_markup(
+        scope,
+        month,
+        allowed,
+        rng.start,
+        rng.end,
+        title,
+        allowed if dates_with_slots is None else _frozen(dates_with_slots),
+        _EMPTY if closed_dates is None else _frozen(closed_dates),
+        _EMPTY if open_dates is None else _frozen(open_dates),
+    )
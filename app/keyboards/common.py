@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from functools import cache
+
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -13,7 +15,19 @@ class SubCB(CallbackData, prefix="sub"):
     action: str  # check
 
 
+def button_grid(buttons: list[InlineKeyboardButton], width: int, *tail: InlineKeyboardButton) -> InlineKeyboardMarkup:
+    """
+    Кнопки по width в ряд, каждая из tail — отдельным рядом снизу.
+    Для длинных списков вместо InlineKeyboardBuilder: тот копирует всю разметку на каждой кнопке.
+    """
+    rows = [buttons[i:i + width] for i in range(0, len(buttons), width)]
+    rows.extend([b] for b in tail)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+@cache
 def main_menu_kb(is_admin: bool) -> InlineKeyboardMarkup:
+    """Главное меню: всего два варианта (админ/клиент), строятся по разу. Не изменять."""
     kb = InlineKeyboardBuilder()
     kb.button(text="🗓 Записаться", callback_data=MenuCB(action="book").pack())
     kb.button(text="📌 Моя запись / Отмена", callback_data=MenuCB(action="my").pack())
@@ -26,6 +40,7 @@ def main_menu_kb(is_admin: bool) -> InlineKeyboardMarkup:
     return kb.as_markup()
 
 
+@cache
 def back_to_menu_kb() -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
     kb.button(text="⬅️ В меню", callback_data=MenuCB(action="menu").pack())
@@ -0,0 +1,2 @@
+"""Middlewares package."""
+
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class AdminFlagMiddleware(BaseMiddleware):
+    """
+    Кладёт в data["is_admin"] признак администратора — один раз на апдейт.
+    Обработчики получают его аргументом `is_admin: bool`.
+    """
+
+    def __init__(self, admin_id: int) -> None:
+        self.admin_id = admin_id
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        data["is_admin"] = user is not None and user.id == self.admin_id
+        return await handler(event, data)
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+
+class AdminOnlyMiddleware(BaseMiddleware):
+    """
+    Пропускает к обработчикам роутера только администратора.
+    Внутренний middleware: срабатывает после фильтров, т.е. только на callback'и этого роутера.
+    Признак берёт из data["is_admin"] (AdminFlagMiddleware на диспетчере) — свой admin_id не хранит.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: dict[str, Any],
+    ) -> Any:
+        # нет флага (AdminFlagMiddleware не подключён) — доступа тоже нет
+        if not data.get("is_admin", False):
+            await event.answer("Нет доступа.", show_alert=True)
+            return None
+        return await handler(event, data)
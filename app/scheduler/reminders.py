@@ -1,15 +1,21 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
 from aiogram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from zoneinfo import ZoneInfo
 
-from app.constants import DATETIME_FMT
 from app.db.sqlite import Booking, Database
-from app.utils.time import tznow
+from app.utils.time import parse_date_time, parse_dt, tznow
+
+# Через сколько секунд сбрасывать в БД отметки об отправке:
+# напоминания, сработавшие за это время, отмечаются одним commit
+SENT_FLUSH_DELAY = 1.0
+# Сколько секунд при остановке ждём уже запущенный сброс отметок
+FLUSH_SHUTDOWN_TIMEOUT = 5.0
 
 
 @dataclass(slots=True)
@@ -26,6 +32,8 @@ class ReminderScheduler:
     timezone: str
     _tz: ZoneInfo | None = None
     _sched: AsyncIOScheduler | None = None
+    _sent: list[int] = field(default_factory=list)
+    _flush_task: asyncio.Task | None = None
 
     def __post_init__(self) -> None:
         tz = ZoneInfo(self.timezone)
@@ -39,26 +47,41 @@ class ReminderScheduler:
         return f"reminder:{booking_id}"
 
     async def start(self) -> None:
-        self._sched.start()
-        await self.restore_jobs()
+        # Восстанавливаем на паузе: на работающем планировщике каждый add_job
+        # пересчитывает пробуждение, а resume() сделает это один раз за все задачи
+        self._sched.start(paused=True)
+        try:
+            await self.restore_jobs()
+        finally:
+            self._sched.resume()
 
     async def shutdown(self) -> None:
         if self._sched.running:
             self._sched.shutdown(wait=False)
+        task = self._flush_task
+        if task is not None and not task.done():
+            # даём начатому сбросу дописать; по таймауту он отменится и вернёт свои id в _sent
+            try:
+                await asyncio.wait_for(task, FLUSH_SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                print("[ERROR] reminders: pending flush timed out on shutdown")
+            except Exception:
+                pass  # ошибку уже залогировал _flush_done, id вернулись в _sent
+        await self._flush_sent_now()
 
     async def restore_jobs(self) -> None:
         """Восстановить задачи напоминаний после рестарта."""
-        now = tznow(self.timezone).replace(tzinfo=None)
-        bookings = await self.db.list_pending_reminders(now=now)
+        now = tznow(self.timezone)
+        bookings = await self.db.list_pending_reminders(now=now.replace(tzinfo=None))
         for b in bookings:
             if not b.remind_at or not b.reminder_job_id:
                 continue
             try:
-                run_dt = datetime.strptime(b.remind_at, DATETIME_FMT).replace(tzinfo=self._tz)
+                run_dt = parse_dt(b.remind_at).replace(tzinfo=self._tz)
             except ValueError:
                 continue
             # На всякий: если в прошлом — не ставим
-            if run_dt <= tznow(self.timezone):
+            if run_dt <= now:
                 continue
             self._add_job(booking_id=b.id, run_dt=run_dt, job_id=b.reminder_job_id)
 
@@ -79,7 +102,7 @@ class ReminderScheduler:
         Создать задачу за 24 часа до визита.
         Если меньше 24 часов — не создаём.
         """
-        visit_dt = datetime.strptime(f"{booking.date} {booking.time}", "%Y-%m-%d %H:%M").replace(tzinfo=self._tz)
+        visit_dt = parse_date_time(booking.date, booking.time).replace(tzinfo=self._tz)
         now = tznow(self.timezone)
         remind_dt = visit_dt - timedelta(hours=24)
 
@@ -92,15 +115,18 @@ class ReminderScheduler:
         self._add_job(booking_id=booking.id, run_dt=remind_dt, job_id=job_id)
         await self.db.set_booking_reminder(booking.id, job_id=job_id, remind_at=remind_dt.replace(tzinfo=None))
 
-    async def delete_for_booking(self, booking: Booking) -> None:
-        """Удалить задачу напоминания (если была)."""
+    def remove_job(self, booking: Booking) -> None:
+        """
+        Снять задачу напоминания из планировщика (если была).
+        Планировщик не откатывается вместе с БД — вызывать после COMMIT отмены,
+        запись в reminders очищается в той же транзакции через db.clear_booking_reminder.
+        """
         if booking.reminder_job_id:
             try:
                 self._sched.remove_job(booking.reminder_job_id)
             except Exception:
                 # Если задачи нет (например, после рестарта и удаления) — игнорируем
                 pass
-        await self.db.clear_booking_reminder(booking.id)
 
     async def _fire(self, booking_id: int) -> None:
         booking = await self.db.get_booking(booking_id)
@@ -115,5 +141,28 @@ class ReminderScheduler:
             f"Ждём вас ️"
         )
         await self.bot.send_message(chat_id=booking.user_id, text=text)
-        await self.db.mark_reminder_sent(booking_id)
+        self._sent.append(booking_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_sent())
+            self._flush_task.add_done_callback(self._flush_done)
+
+    @staticmethod
+    def _flush_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[ERROR] reminders: flush of sent marks failed: {task.exception()!r}")
+
+    async def _flush_sent(self) -> None:
+        await asyncio.sleep(SENT_FLUSH_DELAY)
+        await self._flush_sent_now()
+
+    async def _flush_sent_now(self) -> None:
+        # пока пишем, могли сработать новые напоминания — забираем и их
+        while self._sent:
+            booking_ids, self._sent = self._sent, []
+            try:
+                await self.db.mark_reminders_sent(booking_ids)
+            except BaseException:
+                # ошибка или отмена — не теряем взятые id: их отметит следующий сброс
+                self._sent[:0] = booking_ids
+                raise
 
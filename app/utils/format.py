@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Iterable
 
+from app.db.sqlite import Booking, Slot
+
 
 def esc(s: str) -> str:
     """Минимальный escape под HTML parse_mode."""
+    # обычно экранировать нечего (даты, время, телефоны) — строку отдаём как есть
+    if "&" not in s and "<" not in s and ">" not in s and '"' not in s:
+        return s
     return (
         s.replace("&", "&amp;")
         .replace("<", "&lt;")
@@ -13,37 +19,64 @@ def esc(s: str) -> str:
     )
 
 
-def format_schedule(date: str, slots: Iterable[dict], booked_by: dict[int, dict], public: bool = False) -> str:
+@lru_cache(maxsize=64)
+def format_duration(minutes: int) -> str:
+    """Длительность услуги: «1 ч 30 мин», «2 ч», «45 мин». Разных длительностей мало — кэшируем."""
+    hours, mins = divmod(minutes, 60)
+    if not hours:
+        return f"{mins} мин"
+    return f"{hours} ч {mins} мин" if mins else f"{hours} ч"
+
+
+# Шаблон собран заранее: один %-формат вместо сборки строки по частям на каждый вызов
+_SUMMARY_TMPL = (
+    "%s\n\n"
+    "%s"
+    "Дата: <b>%s</b>\n"
+    "Время: <b>%s</b>\n"
+    "Имя: <b>%s</b>\n"
+    "Телефон: <code>%s</code>"
+)
+_SERVICE_LINE = "Услуга: <b>%s</b>\n"
+
+
+def format_booking_summary(
+    header: str, date: str, time: str, name: str, phone: str, service: str | None = None
+) -> str:
+    """
+    Блок «Услуга/Дата/Время/Имя/Телефон» для сообщений о записи.
+    header — заголовок (уже готовый HTML), строка услуги — только если service передан.
+    """
+    service_line = _SERVICE_LINE % esc(service) if service is not None else ""
+    return _SUMMARY_TMPL % (header, service_line, esc(date), esc(time), esc(name), esc(phone))
+
+
+def _schedule_line(s: Slot, booked_by: dict[int, Booking]) -> str:
+    """Строка расписания для одного слота. is_booked из БД уже int 0/1."""
+    time = esc(s.time)
+    if not s.is_booked:
+        return f"🟢 <b>{time}</b> — свободно"
+    b = booked_by.get(s.booking_id)
+    if b is None:
+        return f"✅ <b>{time}</b> — занято"
+    # Версия для админа — с именами
+    name = esc(b.name)
+    if b.service_name:
+        return f"✅ <b>{time}</b> — {name} ({esc(b.service_name)})"
+    return f"✅ <b>{time}</b> — {name}"
+
+
+def format_schedule(date: str, slots: Iterable[Slot], bookings: Iterable[Booking], public: bool = False) -> str:
     """
     Красивое расписание для канала/админа.
-    booked_by: booking_id -> {"name": str, "service": str}
+    bookings: активные записи на дату (имена и услуги нужны только админу)
     public: если True — скрывать имена клиентов
     """
+    # публичной версии имена не нужны — индекс по id строим только для админа
+    booked_by = {} if public else {b.id: b for b in bookings}
     lines = [f"📅 <b>Расписание на {esc(date)}</b>"]
-    has_any = False
-    for s in slots:
-        has_any = True
-        time = esc(str(s["time"]))
-        if int(s["is_booked"]) == 1 and s.get("booking_id") in booked_by:
-            if public:
-                # Публичная версия — без имён
-                lines.append(f"✅ <b>{time}</b> — занято")
-            else:
-                # Версия для админа — с именами
-                info = booked_by[int(s["booking_id"])]
-                name = esc(info.get("name", "Клиент"))
-                service = esc(info.get("service", ""))
-                if service:
-                    lines.append(f"✅ <b>{time}</b> — {name} ({service})")
-                else:
-                    lines.append(f"✅ <b>{time}</b> — {name}")
-        elif int(s["is_booked"]) == 1:
-            lines.append(f"✅ <b>{time}</b> — занято")
-        else:
-            lines.append(f"🟢 <b>{time}</b> — свободно")
-    
-    if not has_any:
+    lines.extend(_schedule_line(s, booked_by) for s in slots)
+    if len(lines) == 1:
         lines.append("⚠️ <b>Нет слотов</b> — добавьте через админ-панель")
-    
-    return "\n".join(lines)
 
+    return "\n".join(lines)
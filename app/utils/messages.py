@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
+
+
+async def show_screen(call: CallbackQuery, text: str, reply_markup: InlineKeyboardMarkup | None = None) -> None:
+    """
+    Показать следующий экран навигации: отредактировать сообщение, на кнопку которого нажали,
+    а не слать новое. Если редактировать нельзя (сообщение старое/недоступное, это не текст) —
+    отправляем новое сообщение, как раньше.
+    """
+    msg = call.message
+    if isinstance(msg, Message) and msg.text is not None:
+        try:
+            await msg.edit_text(text, reply_markup=reply_markup)
+            return
+        except TelegramBadRequest as e:
+            # тот же текст и кнопки — экран уже на месте
+            if "message is not modified" in str(e):
+                return
+    await call.message.answer(text, reply_markup=reply_markup)  # type: ignore[union-attr]
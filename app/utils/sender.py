@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from heapq import heappop, heappush
+from itertools import count
+from time import monotonic
+from typing import Any, Iterator
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+# Глобальный лимит Telegram ~30 сообщений/с — держим небольшой запас
+GLOBAL_INTERVAL = 1 / 28
+# Интервал между сообщениями в один чат: группы/каналы (id < 0) — до 20 в минуту,
+# личные чаты — около 1 в секунду
+GROUP_CHAT_INTERVAL = 3.0
+PRIVATE_CHAT_INTERVAL = 1.0
+# Сколько чатов помнить, прежде чем чистить устаревшие отметки
+CHAT_MARKS_MAX = 1000
+# Сколько секунд при остановке ждём, пока очередь отправится
+DRAIN_TIMEOUT = 5.0
+
+
+@dataclass(slots=True)
+class NotificationSender:
+    """
+    Очередь исходящих уведомлений (админу, в канал расписания, клиенту от админа).
+    У каждого чата своя очередь и момент, с которого ему можно слать; воркер берёт
+    чат, готовый раньше всех. Так пачка постов в канал (интервал 3 с) не задерживает
+    личные сообщения — они ждут только глобальный лимит и свой интервал на чат.
+    Ответы пользователю на его нажатие идут напрямую, мимо очереди.
+    """
+
+    bot: Bot
+    # chat_id -> сообщения в этот чат по порядку; чат есть здесь, пока ему что-то не отправлено
+    _pending: dict[int, deque[tuple[str, dict[str, Any]]]] = field(default_factory=dict)
+    # куча (когда чату можно слать, порядковый номер, chat_id); каждый чат из _pending — ровно один раз
+    _ready: list[tuple[float, int, int]] = field(default_factory=list)
+    _seq: Iterator[int] = field(default_factory=count)
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    _idle: asyncio.Event = field(default_factory=asyncio.Event)
+    _worker: asyncio.Task | None = None
+    _last_sent: float = 0.0
+    _last_by_chat: dict[int, float] = field(default_factory=dict)
+
+    async def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._worker is None:
+            return
+        if self._pending:
+            try:
+                await asyncio.wait_for(self._idle.wait(), DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                left = sum(len(q) for q in self._pending.values())
+                print(f"[ERROR] sender: {left} notifications not sent on shutdown")
+        self._worker.cancel()
+        self._worker = None
+
+    def enqueue(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        """Поставить сообщение в очередь (kwargs — как у bot.send_message)."""
+        q = self._pending.get(chat_id)
+        if q is None:
+            q = self._pending[chat_id] = deque()
+            self._push_chat(chat_id)
+        q.append((text, kwargs))
+        self._idle.clear()
+        self._wakeup.set()
+
+    def _push_chat(self, chat_id: int) -> None:
+        """Поставить чат в кучу готовности: с учётом его интервала от последней отправки."""
+        last = self._last_by_chat.get(chat_id)
+        ready_at = 0.0 if last is None else last + (GROUP_CHAT_INTERVAL if chat_id < 0 else PRIVATE_CHAT_INTERVAL)
+        heappush(self._ready, (ready_at, next(self._seq), chat_id))
+
+    async def _run(self) -> None:
+        while True:
+            if not self._ready:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            ready_at, _, chat_id = self._ready[0]
+            delay = max(ready_at, self._last_sent + GLOBAL_INTERVAL) - monotonic()
+            if delay > 0:
+                # ждём, но просыпаемся на новое сообщение: его чат может быть готов раньше
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heappop(self._ready)
+            q = self._pending[chat_id]
+            text, kwargs = q.popleft()
+            self._mark_sent(chat_id)
+            await self._send(chat_id, text, kwargs)
+            if q:
+                self._push_chat(chat_id)
+            else:
+                del self._pending[chat_id]
+
+    def _mark_sent(self, chat_id: int) -> None:
+        now = monotonic()
+        self._last_sent = now
+        self._last_by_chat[chat_id] = now
+        if len(self._last_by_chat) > CHAT_MARKS_MAX:
+            # отметки старше самого длинного интервала больше ничего не ограничивают
+            stale = [c for c, t in self._last_by_chat.items() if now - t >= GROUP_CHAT_INTERVAL]
+            for c in stale:
+                del self._last_by_chat[c]
+
+    async def _send(self, chat_id: int, text: str, kwargs: dict[str, Any]) -> None:
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except TelegramRetryAfter as e:
+            # Telegram сам сказал, сколько ждать — ждём и пробуем ещё раз
+            await asyncio.sleep(e.retry_after)
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            except Exception as e2:
+                print(f"[ERROR] sender: message to {chat_id} failed: {e2!r}")
+        except Exception as e:
+            print(f"[ERROR] sender: message to {chat_id} failed: {e!r}")
@@ -1,19 +1,60 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import lru_cache
 
 from zoneinfo import ZoneInfo
 
+from app.constants import DATE_FMT, DATETIME_FMT, TIME_FMT
+
+
+@lru_cache(maxsize=16)
+def _zone(tz: str) -> ZoneInfo:
+    # у ZoneInfo свой кэш, но с блокировкой и слабыми ссылками — наш словарь проще
+    return ZoneInfo(tz)
+
 
 def tznow(tz: str) -> datetime:
     """Текущее время в заданном часовом поясе."""
-    return datetime.now(tz=ZoneInfo(tz))
+    return datetime.now(tz=_zone(tz))
 
 
 def to_tz(dt: datetime, tz: str) -> datetime:
     """Привести datetime к часовому поясу tz (если naive — считаем что он уже tz)."""
-    zone = ZoneInfo(tz)
+    zone = _zone(tz)
     if dt.tzinfo is None:
         return dt.replace(tzinfo=zone)
     return dt.astimezone(zone)
 
+
+
+def parse_dt(s: str) -> datetime:
+    """
+    Разобрать строку в DATETIME_FMT (YYYY-MM-DD HH:MM:SS).
+    Фиксированная ширина — режем срезами, strptime только как запасной вариант.
+    """
+    if len(s) == 19:
+        try:
+            return datetime(
+                int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                int(s[11:13]), int(s[14:16]), int(s[17:19]),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(s, DATETIME_FMT)
+
+
+def parse_date_time(date_s: str, time_s: str) -> datetime:
+    """
+    Разобрать пару DATE_FMT (YYYY-MM-DD) + TIME_FMT (HH:MM) из записи.
+    Как parse_dt: срезы по фиксированной ширине, strptime — запасной вариант.
+    """
+    if len(date_s) == 10 and len(time_s) == 5:
+        try:
+            return datetime(
+                int(date_s[0:4]), int(date_s[5:7]), int(date_s[8:10]),
+                int(time_s[0:2]), int(time_s[3:5]),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(f"{date_s} {time_s}", f"{DATE_FMT} {TIME_FMT}")
@@ -12,7 +12,9 @@ from config import load_config
 
 from app.db.sqlite import Database
 from app.handlers import admin, booking, prices_portfolio, start
+from app.middlewares.admin_flag import AdminFlagMiddleware
 from app.scheduler.reminders import ReminderScheduler
+from app.utils.sender import NotificationSender
 
 
 async def main() -> None:
@@ -54,17 +56,26 @@ async def main() -> None:
     reminder_scheduler = ReminderScheduler(bot=bot, db=db, timezone=cfg.timezone)
     await reminder_scheduler.start()
 
+    # уведомления админу/в канал — через одну очередь с учётом лимитов Telegram
+    sender = NotificationSender(bot)
+    await sender.start()
+
+    # is_admin для всех обработчиков — один раз на апдейт
+    dp.message.middleware(AdminFlagMiddleware(cfg.admin_id))
+    dp.callback_query.middleware(AdminFlagMiddleware(cfg.admin_id))
+
     # Роутеры
     dp.include_router(start.router)
-    dp.include_router(prices_portfolio.router)
-    dp.include_router(booking.get_router(cfg=cfg, db=db, reminders=reminder_scheduler))
-    dp.include_router(admin.get_router(cfg=cfg, db=db, reminders=reminder_scheduler))
+    dp.include_router(prices_portfolio.get_router(db=db))
+    dp.include_router(booking.get_router(cfg=cfg, db=db, reminders=reminder_scheduler, sender=sender))
+    dp.include_router(admin.get_router(cfg=cfg, db=db, reminders=reminder_scheduler, sender=sender))
 
     print(f"[INFO] Bot started successfully!")
     try:
         await dp.start_polling(bot)
     finally:
         await reminder_scheduler.shutdown()
+        await sender.shutdown()
         await db.close()
         await bot.session.close()
 